@@ -1,8 +1,17 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context, g
 import os
+import json
+import time
 import google.generativeai as genai
 from dotenv import load_dotenv
 from flask_cors import CORS
+from session_store import create_session_store
+from context_window import ContextWindow, message_text, estimate_tokens
+from flights import normalize_params, get_flights, flight_cache
+from destinations import get_destination_index, ORIGIN_PATTERN
+from flight_store import flight_store, SnapshotExpired
+from response_cache import create_response_cache
+import metrics
 
 # Load environment variables
 load_dotenv()
@@ -12,7 +21,8 @@ CORS(app)  # Enable CORS for all routes
 
 # Configure Google Generative AI
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-print("Loaded API key:", os.getenv("GEMINI_API_KEY"))
+if not os.getenv("GEMINI_API_KEY"):
+    print("Warning: GEMINI_API_KEY is not set")
 
 
 # Define the system prompt
@@ -30,8 +40,91 @@ model = genai.GenerativeModel(
     system_instruction=system_prompt
 )
 
-# Store chat sessions by user (in a real app, you'd use a database)
-chat_sessions = {}
+# Smaller, faster model used to fold old turns into a rolling summary
+summary_model = genai.GenerativeModel('gemini-1.5-flash-latest')
+
+# Store chat sessions by user (bounded in memory, or SQLite via SESSION_STORE=sqlite)
+session_store = create_session_store()
+
+
+def summarize_history(previous_summary, messages, max_tokens):
+    """Fold messages that left the context window into the running summary."""
+    transcript = "\n".join(f"{m['role']}: {message_text(m)}" for m in messages)
+    prompt = (
+        "Update the running summary of a travel-planning conversation. "
+        "Keep destinations, dates, budget and traveler preferences; be brief.\n"
+        f"Current summary: {previous_summary or '(none)'}\n"
+        f"New messages:\n{transcript}"
+    )
+    response = summary_model.generate_content(
+        prompt,
+        generation_config={"temperature": 0.2, "max_output_tokens": max_tokens}
+    )
+    return response.text.strip()
+
+
+# Keep each request under a token budget: recent turns verbatim, older ones summarized
+context_window = ContextWindow(
+    token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", 2000)),
+    summary_tokens=int(os.getenv("CONTEXT_SUMMARY_TOKENS", 200)),
+    message_allowance=int(os.getenv("CONTEXT_MESSAGE_TOKENS", 200)),
+    summarize=summarize_history,
+    system_prompt=system_prompt
+)
+
+# Optional cache of first-turn replies (RESPONSE_CACHE=1)
+response_cache = create_response_cache()
+
+
+def cached_reply(chat_history, user_message):
+    """Cached reply for a first-turn message, or None."""
+    if response_cache is None:
+        return None
+    if chat_history:
+        # Earlier turns change the answer, so a cached reply would be wrong
+        response_cache.bypass()
+        return None
+    return response_cache.get(user_message)
+
+
+def cache_reply(chat_history, user_message, response_text, started):
+    if response_cache is not None and not chat_history:
+        response_cache.put(user_message, response_text, time.perf_counter() - started)
+
+
+def prompt_usage(response, estimated_tokens):
+    """Prompt token counts for a request, as estimated and as reported by Gemini."""
+    usage = {"estimated_prompt_tokens": estimated_tokens}
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is not None and getattr(metadata, "prompt_token_count", None):
+        usage["prompt_tokens"] = metadata.prompt_token_count
+    if metadata is not None and getattr(metadata, "candidates_token_count", None):
+        usage["output_tokens"] = metadata.candidates_token_count
+    return usage
+
+
+def count_tokens(usage, response_text):
+    metrics.tokens.inc("in", amount=usage.get("prompt_tokens", usage["estimated_prompt_tokens"]))
+    metrics.tokens.inc("out", amount=usage.get("output_tokens", estimate_tokens(response_text)))
+
+
+@app.before_request
+def start_timer():
+    if metrics.ENABLED:
+        g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_latency(response):
+    # For streamed responses this measures the time until the stream starts
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.request_latency.observe(
+            time.perf_counter() - started, route, request.method, response.status_code
+        )
+    return response
+
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -51,43 +144,299 @@ def chat():
             return jsonify({"error": "No message provided"}), 400
 
 
-        # Create a chat session if it doesn't exist yet
-        if session_id not in chat_sessions:
-            chat_sessions[session_id] = []
+        # Get the current chat history (empty for a new session)
+        with metrics.stage("history"):
+            chat_history = session_store.get(session_id)
         
-        # Get the current chat history
-        chat_history = chat_sessions[session_id]
+        with metrics.stage("response_cache"):
+            cached = cached_reply(chat_history, user_message)
+        if cached is not None:
+            response_text = cached
+            usage = {"estimated_prompt_tokens": 0, "cached": True}
+        else:
+            started = time.perf_counter()
+            
+            # Fit the history into the token budget; the user message is sent separately
+            with metrics.stage("context"):
+                prompt_history, prompt_tokens = context_window.build(session_id, chat_history, user_message)
+            
+            # Create chat instance with system prompt
+            with metrics.stage("start_chat"):
+                chat = model.start_chat(history=prompt_history)
+            
+            # Generate response
+            with metrics.stage("generate"):
+                response = chat.send_message(
+                    user_message,
+                    generation_config={"temperature": 0.7, "max_output_tokens": 800},
+                    safety_settings=[]
+                )
+                response_text = response.text
+            usage = prompt_usage(response, prompt_tokens)
+            count_tokens(usage, response_text)
+            cache_reply(chat_history, user_message, response_text, started)
         
-        # Add user message to history
+        # Add the exchange to history
         chat_history.append({"role": "user", "parts": [{"text": user_message}]})
-        
-        # Create chat instance with system prompt
-        chat = model.start_chat(history=chat_history)
-        
-        # Generate response
-        response = chat.send_message(
-            user_message,
-            generation_config={"temperature": 0.7, "max_output_tokens": 800},
-            safety_settings=[]
-        )
-        
-        # Add model response to history
-        response_text = response.text
         chat_history.append({"role": "model", "parts": [{"text": response_text}]})
         
-        # Keep chat history to a reasonable size (last 10 exchanges)
-        if len(chat_history) > 20:
-            chat_history = chat_history[-20:]
+        # Update the session (the store enforces its own size budget)
+        with metrics.stage("save"):
+            session_store.save(session_id, chat_history)
         
-        # Update the session
-        chat_sessions[session_id] = chat_history
-        
-        return jsonify({"response": response_text}), 200, response_headers
+        with metrics.stage("serialize"):
+            body = jsonify({"response": response_text, "usage": usage})
+        return body, 200, response_headers
         
     except Exception as e:
         print(f"Error: {e}")
+        metrics.record_error(e)
         return jsonify({"error": str(e)}), 500, response_headers
 
 
+def sse_event(payload, event=None):
+    """Format a payload as a single Server-Sent Events message."""
+    message = f"data: {json.dumps(payload)}\n\n"
+    if event:
+        message = f"event: {event}\n" + message
+    return message
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    data = request.json or {}
+    user_message = data.get('message', '')
+    session_id = data.get('sessionId', 'default')
+
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+
+    # Work on a copy so nothing is stored until the reply is complete
+    with metrics.stage("history"):
+        chat_history = session_store.get(session_id)
+
+    def generate():
+        cached = cached_reply(chat_history, user_message)
+        if cached is not None:
+            session_store.save(session_id, chat_history + [
+                {"role": "user", "parts": [{"text": user_message}]},
+                {"role": "model", "parts": [{"text": cached}]}
+            ])
+            yield sse_event({"text": cached})
+            yield sse_event({"response": cached, "usage": {"estimated_prompt_tokens": 0, "cached": True}},
+                            event="done")
+            return
+
+        chunks = []
+        started = time.perf_counter()
+        try:
+            with metrics.stage("context"):
+                prompt_history, prompt_tokens = context_window.build(session_id, chat_history, user_message)
+            with metrics.stage("start_chat"):
+                chat = model.start_chat(history=prompt_history)
+            response = chat.send_message(
+                user_message,
+                generation_config={"temperature": 0.7, "max_output_tokens": 800},
+                safety_settings=[],
+                stream=True
+            )
+
+            # Pass each model chunk through to the client as it arrives
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. finish metadata)
+                    continue
+                if not text:
+                    continue
+                if not chunks:
+                    metrics.stage_latency.observe(time.perf_counter() - started, "first_chunk")
+                chunks.append(text)
+                yield sse_event({"text": text})
+            metrics.stage_latency.observe(time.perf_counter() - started, "generate_stream")
+        except GeneratorExit:
+            # Client disconnected mid-stream: drop the partial reply
+            print(f"Client disconnected from stream for session {session_id}")
+            raise
+        except Exception as e:
+            print(f"Error: {e}")
+            metrics.record_error(e)
+            yield sse_event({"error": str(e)}, event="error")
+            return
+
+        if not chunks:
+            # e.g. a reply blocked by safety filters: nothing to cache or store
+            metrics.errors.inc("EmptyResponse")
+            yield sse_event({"error": "The model returned an empty response"}, event="error")
+            return
+
+        response_text = "".join(chunks)
+        cache_reply(chat_history, user_message, response_text, started)
+
+        # Save the exchange only once the full reply has been generated
+        chat_history.append({"role": "user", "parts": [{"text": user_message}]})
+        chat_history.append({"role": "model", "parts": [{"text": response_text}]})
+        session_store.save(session_id, chat_history)
+
+        usage = prompt_usage(response, prompt_tokens)
+        count_tokens(usage, response_text)
+
+        yield sse_event({"response": response_text, "usage": usage}, event="done")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Access-Control-Allow-Origin": "*"
+        }
+    )
+
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def session_stats():
+    stats = session_store.stats()
+    if response_cache is not None:
+        stats["response_cache"] = response_cache.stats()
+    return jsonify(stats)
+
+
+# Upstream errors are logged, not sent to the client
+FLIGHTS_UNAVAILABLE = "Flight data is unavailable, try again later"
+
+
+@app.route('/api/flights', methods=['GET'])
+def flights():
+    try:
+        params = normalize_params(request.args)
+    except ValueError:
+        return jsonify({"error": {"info": "limit and offset must be integers"}}), 400
+
+    try:
+        return jsonify(get_flights(params)), 200, {"Cache-Control": "public, max-age=30"}
+    except Exception as e:
+        print(f"Error: {e}")
+        metrics.record_error(e)
+        return jsonify({"error": {"info": FLIGHTS_UNAVAILABLE}}), 502
+
+
+@app.route('/api/flights/search', methods=['GET'])
+def search_flights():
+    status = (request.args.get('status') or '').strip().casefold() or None
+    search = (request.args.get('q') or '').strip()
+    sort = request.args.get('sort', 'departure')
+    # Only upcoming departures by default, as the flight list shows
+    after = None if request.args.get('upcoming') == '0' else time.time()
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 10)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    # Version of the snapshot the client is paging through, so pages stay consistent
+    version = request.args.get('version') or None
+
+    try:
+        snapshot = flight_store.get_snapshot(version)
+    except SnapshotExpired as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        print(f"Error: {e}")
+        metrics.record_error(e)
+        return jsonify({"error": FLIGHTS_UNAVAILABLE}), 502
+
+    try:
+        records, total = snapshot.query(status, search, sort, after, offset, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "data": [record.to_dict() for record in records],
+        "pagination": {"offset": offset, "limit": limit, "count": len(records), "total": total},
+        "snapshot": {"version": snapshot.version, "fetched_at": snapshot.fetched_at}
+    })
+
+
+@app.route('/api/destinations', methods=['GET'])
+def destinations():
+    origin = (request.args.get('origin') or 'MA').strip().upper()
+    airport = request.args.get('airport')
+    cursor = request.args.get('cursor')
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if not ORIGIN_PATTERN.fullmatch(origin):
+        return jsonify({"error": "origin must be a two-letter country code"}), 400
+
+    try:
+        index = get_destination_index(origin)
+    except Exception as e:
+        print(f"Error: {e}")
+        metrics.record_error(e)
+        return jsonify({"error": FLIGHTS_UNAVAILABLE}), 502
+
+    # The list only changes when the index is rebuilt, so repeat visits can revalidate for free
+    etag = f"{index.etag}-{airport or cursor or ''}-{limit}"
+    if request.if_none_match.contains(etag):
+        return "", 304, {"ETag": f'"{etag}"'}
+
+    if airport:
+        destination = index.by_airport.get(airport)
+        if destination is None:
+            return jsonify({"error": "Unknown destination"}), 404
+        response = jsonify(destination)
+    else:
+        try:
+            items, next_cursor = index.page(cursor, limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        response = jsonify({"data": items, "next_cursor": next_cursor, "total": len(index.items)})
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "public, max-age=30"
+    return response
+
+
+@app.route('/api/flights/stats', methods=['GET'])
+def flight_stats():
+    stats = flight_cache.stats()
+    stats["snapshot"] = flight_store.stats()
+    return jsonify(stats)
+
+
+metrics.register_gauge("chat_sessions", "Sessions held by the session store", lambda: len(session_store))
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/debug/profile', methods=['GET'])
+def profile():
+    # Sampling profiler for hot-path investigation, only when PROFILER=1
+    if os.getenv("PROFILER") != "1":
+        return jsonify({"error": "Profiler disabled, set PROFILER=1"}), 404
+    try:
+        seconds = float(request.args.get('seconds', 10))
+    except ValueError:
+        seconds = None
+    # Also rejects nan
+    if seconds is None or not seconds > 0:
+        return jsonify({"error": "seconds must be a positive number"}), 400
+    seconds = min(seconds, 60)
+
+    # One profile at a time: a second request would cut the first one short
+    if not metrics.profiler.start():
+        return jsonify({"error": "A profile is already being taken"}), 409
+    try:
+        time.sleep(seconds)
+    finally:
+        output = metrics.profiler.stop()
+    return Response(output, mimetype='text/plain')
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""Async (ASGI) entry point for the chat backend.
+
+Serves the same /api/chat and /api/chat/stream routes as app.py, but with
+the async Gemini API so one worker can keep many requests in flight. The
+flight and destination routes are served by the Flask app from app.py,
+run in a thread pool, so both entry points expose the full API:
+
+    hypercorn asgi:app --bind 0.0.0.0:5000
+"""
+import asyncio
+import os
+import time
+
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, Response, request, jsonify, g
+
+from app import app as flask_app
+from app import (model, session_store, context_window, prompt_usage, sse_event,
+                 response_cache, cached_reply, cache_reply, count_tokens)
+from gemini_client import AsyncGeminiClient, Overloaded
+import metrics
+
+app = Quart(__name__)
+
+# Routes handled by the Flask app; their upstream calls are blocking anyway
+FLASK_PATHS = ("/api/flights", "/api/destinations")
+
+generation_config = {"temperature": 0.7, "max_output_tokens": 800}
+
+client = AsyncGeminiClient(
+    model,
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", 8)),
+    max_queue=int(os.getenv("GEMINI_MAX_QUEUE", 32)),
+    timeout=float(os.getenv("GEMINI_TIMEOUT", 30)),
+    retries=int(os.getenv("GEMINI_RETRIES", 3))
+)
+metrics.register_gauge("gemini_pending_requests", "Gemini calls running or queued", lambda: client.pending)
+
+
+@app.before_request
+async def start_timer():
+    if metrics.ENABLED:
+        g.request_started = time.perf_counter()
+
+
+@app.after_request
+async def add_cors_headers(response):
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.request_latency.observe(
+            time.perf_counter() - started, route, request.method, response.status_code
+        )
+    return response
+
+
+def overloaded_response(e):
+    return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
+
+async def read_chat_request():
+    data = await request.get_json(silent=True) or {}
+    return data.get('message', ''), data.get('sessionId', 'default')
+
+
+@app.route('/api/chat', methods=['POST'])
+async def chat():
+    user_message, session_id = await read_chat_request()
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+
+    try:
+        # Admitted before waiting, and messages in the same session must not
+        # interleave their history writes
+        async with client.reserve(session_id):
+            with metrics.stage("history"):
+                chat_history = await asyncio.to_thread(session_store.get, session_id)
+
+            with metrics.stage("response_cache"):
+                cached = cached_reply(chat_history, user_message)
+            if cached is not None:
+                response_text = cached
+                usage = {"estimated_prompt_tokens": 0, "cached": True}
+            else:
+                started = time.perf_counter()
+
+                # May call the summary model, so keep it off the event loop
+                with metrics.stage("context"):
+                    prompt_history, prompt_tokens = await asyncio.to_thread(
+                        context_window.build, session_id, chat_history, user_message
+                    )
+
+                with metrics.stage("generate"):
+                    response = await client.send_message(
+                        prompt_history,
+                        user_message,
+                        generation_config=generation_config,
+                        safety_settings=[]
+                    )
+                    response_text = response.text
+                usage = prompt_usage(response, prompt_tokens)
+                count_tokens(usage, response_text)
+                cache_reply(chat_history, user_message, response_text, started)
+
+            chat_history.append({"role": "user", "parts": [{"text": user_message}]})
+            chat_history.append({"role": "model", "parts": [{"text": response_text}]})
+            with metrics.stage("save"):
+                await asyncio.to_thread(session_store.save, session_id, chat_history)
+
+        with metrics.stage("serialize"):
+            return jsonify({"response": response_text, "usage": usage}), 200
+
+    except Overloaded as e:
+        metrics.record_error(e)
+        return overloaded_response(e)
+    except Exception as e:
+        print(f"Error: {e}")
+        metrics.record_error(e)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream():
+    user_message, session_id = await read_chat_request()
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+
+    # Fail fast before opening the stream when the queue is already full
+    if client.pending >= client.max_concurrency + client.max_queue:
+        return overloaded_response(Overloaded("Too many requests in flight, try again later"))
+
+    async def generate():
+        chunks = []
+        last_chunk = None
+        try:
+            async with client.reserve(session_id):
+                with metrics.stage("history"):
+                    chat_history = await asyncio.to_thread(session_store.get, session_id)
+
+                cached = cached_reply(chat_history, user_message)
+                if cached is not None:
+                    chat_history.append({"role": "user", "parts": [{"text": user_message}]})
+                    chat_history.append({"role": "model", "parts": [{"text": cached}]})
+                    await asyncio.to_thread(session_store.save, session_id, chat_history)
+                    yield sse_event({"text": cached})
+                    yield sse_event({"response": cached, "usage": {"estimated_prompt_tokens": 0, "cached": True}},
+                                    event="done")
+                    return
+
+                started = time.perf_counter()
+                with metrics.stage("context"):
+                    prompt_history, prompt_tokens = await asyncio.to_thread(
+                        context_window.build, session_id, chat_history, user_message
+                    )
+
+                async for chunk in client.stream_message(
+                    prompt_history,
+                    user_message,
+                    generation_config=generation_config,
+                    safety_settings=[]
+                ):
+                    last_chunk = chunk
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        continue
+                    if not text:
+                        continue
+                    if not chunks:
+                        metrics.stage_latency.observe(time.perf_counter() - started, "first_chunk")
+                    chunks.append(text)
+                    yield sse_event({"text": text})
+                metrics.stage_latency.observe(time.perf_counter() - started, "generate_stream")
+
+                if not chunks:
+                    # e.g. a reply blocked by safety filters: nothing to cache or store
+                    metrics.errors.inc("EmptyResponse")
+                    yield sse_event({"error": "The model returned an empty response"}, event="error")
+                    return
+
+                response_text = "".join(chunks)
+                cache_reply(chat_history, user_message, response_text, started)
+                chat_history.append({"role": "user", "parts": [{"text": user_message}]})
+                chat_history.append({"role": "model", "parts": [{"text": response_text}]})
+                with metrics.stage("save"):
+                    await asyncio.to_thread(session_store.save, session_id, chat_history)
+
+            usage = prompt_usage(last_chunk, prompt_tokens)
+            count_tokens(usage, response_text)
+            yield sse_event({"response": response_text, "usage": usage}, event="done")
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client disconnected mid-stream: drop the partial reply
+            print(f"Client disconnected from stream for session {session_id}")
+            raise
+        except Overloaded as e:
+            metrics.record_error(e)
+            yield sse_event({"error": str(e)}, event="error")
+        except Exception as e:
+            print(f"Error: {e}")
+            metrics.record_error(e)
+            yield sse_event({"error": str(e)}, event="error")
+
+    return generate(), 200, {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    }
+
+
+@app.route('/api/sessions/stats', methods=['GET'])
+async def session_stats():
+    # The SQLite store queries the database
+    stats = await asyncio.to_thread(session_store.stats)
+    stats["pending_requests"] = client.pending
+    if response_cache is not None:
+        stats["response_cache"] = response_cache.stats()
+    return jsonify(stats)
+
+
+@app.route('/metrics', methods=['GET'])
+async def prometheus_metrics():
+    # Gauges may read the session store
+    return Response(await asyncio.to_thread(metrics.render), mimetype='text/plain; version=0.0.4')
+
+
+quart_asgi_app = app.asgi_app
+flask_asgi_app = AsyncioWSGIMiddleware(flask_app)
+
+
+async def dispatch(scope, receive, send):
+    if scope["type"] == "http" and scope["path"].startswith(FLASK_PATHS):
+        await flask_asgi_app(scope, receive, send)
+    else:
+        await quart_asgi_app(scope, receive, send)
+
+
+app.asgi_app = dispatch
+
+
+if __name__ == '__main__':
+    app.run(debug=True, port=5000)
@@ -0,0 +1,323 @@
+"""Load test for the backend against local fake Gemini and aviationstack servers.
+
+Runs the Flask (or ASGI) app in-process with genai.GenerativeModel swapped
+for FakeGenerativeModel, drives /api/chat and the flight endpoints with many
+concurrent sessions, and prints a JSON report (latency percentiles, RPS,
+time to first token, session store growth) that can be compared across
+commits:
+
+    python bench.py --concurrency 32 --sessions 200 --turns 8 --stream --output bench.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import fake_upstreams
+from fake_upstreams import FakeLLMServer, FakeFlightServer, FakeGenerativeModel
+
+PROMPTS = (
+    "Where should I go in winter?",
+    "Beach destinations for families",
+    "Cheap city break from Casablanca in spring",
+    "What about somewhere with good hiking?",
+    "Any food-focused trips you would recommend?",
+    "How many days do I need there?",
+)
+
+FLIGHT_REQUESTS = (
+    ("flights", "/api/flights", {"dep_country": "MA", "limit": 100}),
+    ("destinations", "/api/destinations", {"origin": "MA", "limit": 10}),
+    ("flights_search", "/api/flights/search", {"status": "scheduled", "sort": "departure", "limit": 10}),
+    ("flights_search", "/api/flights/search", {"q": "Air", "upcoming": "0", "limit": 10}),
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", choices=("flask", "asgi"), default="flask")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--sessions", type=int, default=64, help="conversations to run")
+    parser.add_argument("--turns", type=int, default=6, help="messages per conversation")
+    parser.add_argument("--stream", action="store_true", help="use /api/chat/stream")
+    parser.add_argument("--flight-ratio", type=float, default=0.5,
+                        help="flight requests sent per chat message, on average")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=100.0, help="generated tokens per second")
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--flights", type=int, default=500, help="flights served by the fake API")
+    parser.add_argument("--flight-latency", type=float, default=0.2)
+    parser.add_argument("--flight-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(kind):
+    """Import the backend with fakes in place and serve it on a free port."""
+    import google.generativeai as genai
+    genai.GenerativeModel = FakeGenerativeModel
+
+    port = free_port()
+    if kind == "flask":
+        from werkzeug.serving import make_server
+        import app
+        server = make_server("127.0.0.1", port, app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{port}", app, server.shutdown
+
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    import app
+    import asgi
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.accesslog = None
+    loop = asyncio.new_event_loop()
+    stopped = asyncio.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve(asgi.app, config, shutdown_trigger=stopped.wait))
+
+    threading.Thread(target=run, daemon=True).start()
+    # Wait until hypercorn accepts connections
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", app, lambda: loop.call_soon_threadsafe(stopped.set)
+
+
+def session_store_size(app):
+    """Sessions held and approximate bytes of stored history."""
+    from session_store import MemorySessionStore, history_size
+    store = app.session_store
+    size = {"sessions": len(store)}
+    if isinstance(store, MemorySessionStore):
+        size["bytes"] = sum(history_size(history) for _, history in list(store._sessions.values()))
+    return size
+
+
+def max_rss_bytes():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def chat_turn(http, base_url, session_id, message, stream):
+    """Send one chat message; return (ok, latency, time to first token).
+
+    Time to first token is None for non-streamed and failed requests.
+    """
+    started = time.perf_counter()
+    body = {"message": message, "sessionId": session_id}
+    if not stream:
+        response = http.post(f"{base_url}/api/chat", json=body, timeout=120)
+        return response.status_code == 200, time.perf_counter() - started, None
+
+    first_token = None
+    ok = False
+    with http.post(f"{base_url}/api/chat/stream", json=body, stream=True, timeout=120) as response:
+        event = "message"
+        for line in response.iter_lines():
+            if line.startswith(b"event:"):
+                event = line[6:].strip().decode()
+            elif line.startswith(b"data:"):
+                if event == "message" and first_token is None:
+                    first_token = time.perf_counter() - started
+                ok = event == "done"
+                event = "message"
+        ok = ok and response.status_code == 200
+    latency = time.perf_counter() - started
+    # A failed stream has no meaningful time to first token
+    if not ok:
+        return ok, latency, None
+    return ok, latency, first_token if first_token is not None else latency
+
+
+def run_conversation(base_url, session_index, args, record):
+    rng = random.Random(args.seed * 100003 + session_index)
+    session_id = f"bench-{session_index}"
+    with requests.Session() as http:
+        for turn in range(args.turns):
+            message = f"{rng.choice(PROMPTS)} (turn {turn})"
+            try:
+                ok, latency, ttft = chat_turn(http, base_url, session_id, message, args.stream)
+            except requests.RequestException:
+                ok, latency, ttft = False, None, None
+            record("chat", ok, latency, ttft)
+
+            flight_calls = int(args.flight_ratio) + (rng.random() < args.flight_ratio % 1)
+            for _ in range(flight_calls):
+                name, path, params = rng.choice(FLIGHT_REQUESTS)
+                started = time.perf_counter()
+                try:
+                    response = http.get(f"{base_url}{path}", params=params, timeout=60)
+                    ok = response.status_code == 200
+                except requests.RequestException:
+                    ok = False
+                record(name, ok, time.perf_counter() - started, None)
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+def summarize(samples, elapsed):
+    latencies = [s["latency"] for s in samples if s["latency"] is not None]
+    ttfts = [s["ttft"] for s in samples if s["ttft"] is not None]
+    summary = {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s["ok"]),
+        "rps": round(len(samples) / elapsed, 3) if elapsed else None,
+    }
+    for p in (50, 95, 99):
+        value = percentile(latencies, p)
+        summary[f"p{p}_ms"] = round(value * 1000, 3) if value is not None else None
+    if ttfts:
+        for p in (50, 95, 99):
+            summary[f"ttft_p{p}_ms"] = round(percentile(ttfts, p) * 1000, 3)
+    return summary
+
+
+def git_commit():
+    try:
+        # The commit of this checkout, wherever the bench is run from
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+
+    # Keep stdout for the report; the backend's own logging goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+def run(args):
+
+    llm = FakeLLMServer(latency=args.llm_latency, token_rate=args.token_rate,
+                        reply_tokens=args.reply_tokens, error_rate=args.llm_error_rate,
+                        seed=args.seed).start()
+    flights = FakeFlightServer(flights=args.flights, latency=args.flight_latency,
+                               error_rate=args.flight_error_rate, seed=args.seed).start()
+    fake_upstreams.LLM_URL = llm.url
+
+    # Must be set before the backend modules read them at import time
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ["AVIATIONSTACK_API_KEY"] = "bench"
+    os.environ["AVIATIONSTACK_URL"] = f"{flights.url}/v1/flights"
+
+    base_url, app, stop_backend = start_backend(args.server)
+
+    samples = defaultdict(list)
+    lock = threading.Lock()
+
+    def record(kind, ok, latency, ttft):
+        with lock:
+            samples[kind].append({"ok": ok, "latency": latency, "ttft": ttft})
+
+    # Sample session store growth once a second while the load runs
+    growth = []
+    done = threading.Event()
+    started = time.perf_counter()
+
+    def sample_store():
+        while not done.wait(1.0):
+            growth.append({"t": round(time.perf_counter() - started, 1), **session_store_size(app)})
+
+    threading.Thread(target=sample_store, daemon=True).start()
+    rss_before = max_rss_bytes()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(run_conversation, base_url, index, args, record)
+                   for index in range(args.sessions)]
+
+    # A conversation that raised stopped early; count it rather than drop it silently
+    failed_conversations = []
+    for index, future in enumerate(futures):
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Conversation {index} failed: {e!r}")
+            failed_conversations.append({"session": index, "error": repr(e)})
+
+    elapsed = time.perf_counter() - started
+    done.set()
+
+    all_samples = [s for kind_samples in samples.values() for s in kind_samples]
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "config": vars(args),
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize(all_samples, elapsed),
+        "conversations": {
+            "run": args.sessions,
+            "failed": len(failed_conversations),
+            "failures": failed_conversations[:20],
+        },
+        "endpoints": {kind: summarize(kind_samples, elapsed) for kind, kind_samples in sorted(samples.items())},
+        "session_store": {
+            "final": session_store_size(app),
+            "growth": growth,
+            "stats": app.session_store.stats(),
+        },
+        "memory": {
+            "max_rss_bytes": max_rss_bytes(),
+            "max_rss_growth_bytes": max_rss_bytes() - rss_before,
+        },
+        "upstreams": {
+            "llm": {"requests": llm.requests, "injected_errors": llm.errors},
+            "flights": {"requests": flights.requests, "injected_errors": flights.errors},
+        },
+        "flight_cache": app.flight_cache.stats(),
+    }
+    if app.response_cache is not None:
+        report["response_cache"] = app.response_cache.stats()
+
+    stop_backend()
+    llm.stop()
+    flights.stop()
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for Gemini models)."""
+    return (len(text) + 3) // 4
+
+
+def message_text(message):
+    return "".join(part.get("text", "") for part in message.get("parts", []))
+
+
+def message_tokens(message):
+    # A few tokens of overhead per message for the role/turn markers
+    return estimate_tokens(message_text(message)) + 4
+
+
+def fingerprint(message):
+    return hashlib.sha1(
+        f"{message.get('role')}:{message_text(message)}".encode("utf-8")
+    ).hexdigest()
+
+
+class ContextWindow:
+    """Fits a chat history into a per-request token budget.
+
+    The most recent turns are kept verbatim. Older turns are folded into a
+    rolling summary that is cached per session and only extended when the
+    window slides, i.e. when more messages fall out of the verbatim window.
+    The fold boundary only ever moves forward, so a folded turn is never
+    summarized twice.
+
+    The window is sized for a user message of message_allowance tokens. A
+    longer message drops the oldest verbatim exchanges from that request's
+    prompt (without folding them) to stay within token_budget; only a user
+    message that is larger than the whole budget on its own goes over it.
+    """
+
+    def __init__(self, token_budget=2000, summary_tokens=200, message_allowance=200,
+                 summarize=None, system_prompt="", max_cached_summaries=1000):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        # Fixed allowance for the new user message, so its length doesn't move the window
+        self.message_allowance = message_allowance
+        self.summarize = summarize
+        self.system_tokens = estimate_tokens(system_prompt)
+        self.max_cached_summaries = max_cached_summaries
+        # session_id -> (fingerprints of the folded messages, summary text)
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def split(self, history):
+        """Return (older, recent): the messages that don't fit the budget and those that do."""
+        available = (self.token_budget - self.system_tokens - self.summary_tokens
+                     - self.message_allowance)
+        start = len(history)
+        used = 0
+        # Walk back over whole user/model exchanges, newest first
+        while start >= 2:
+            cost = message_tokens(history[start - 2]) + message_tokens(history[start - 1])
+            if used + cost > available:
+                break
+            used += cost
+            start -= 2
+        return history[:start], history[start:]
+
+    @staticmethod
+    def folded_count(folded, fingerprints):
+        """How many leading messages of history were already folded.
+
+        folded holds the fingerprints of every message folded so far. The
+        session store may since have dropped whole exchanges from the front,
+        so find the smallest number of dropped messages for which the rest of
+        the folded run still starts the history. Matching the whole run,
+        rather than the last message only, keeps repeated replies ("ok",
+        "Sure!") from being mistaken for the boundary.
+        """
+        for dropped in range(0, len(folded) + 1, 2):
+            kept = folded[dropped:]
+            if tuple(fingerprints[:len(kept)]) == kept:
+                return len(kept)
+        return 0
+
+    def _fold(self, session_id, history):
+        """Return (summary, recent), extending the cached summary only with newly folded turns."""
+        older, recent = self.split(history)
+        with self._lock:
+            cached = self._summaries.get(session_id)
+
+        fingerprints = [fingerprint(message) for message in history]
+        previous = ""
+        start = 0
+        if cached:
+            start = self.folded_count(cached[0], fingerprints)
+            previous = cached[1]
+
+        # Never un-fold: everything up to the last folded message stays folded
+        boundary = max(len(older), start)
+        new_messages = history[start:boundary]
+        recent = history[boundary:]
+
+        if not new_messages or self.summarize is None:
+            return previous, recent
+
+        try:
+            summary = self.summarize(previous, new_messages, self.summary_tokens)
+        except Exception as e:
+            print(f"Summary error: {e}")
+            # Keep the unsummarized turns verbatim rather than dropping them
+            return previous, list(new_messages) + list(recent)
+
+        with self._lock:
+            self._summaries[session_id] = (tuple(fingerprints[:boundary]), summary)
+            self._summaries.move_to_end(session_id)
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+        return summary, recent
+
+    def build(self, session_id, history, user_message):
+        """Return (prompt_history, estimated_prompt_tokens) for the next request.
+
+        prompt_history excludes user_message, which is sent separately.
+        """
+        summary, recent = self._fold(session_id, history)
+
+        # A message over its allowance takes the room of the oldest verbatim exchanges
+        overrun = estimate_tokens(user_message) - self.message_allowance
+        recent = list(recent)
+        while overrun > 0 and len(recent) >= 2:
+            overrun -= message_tokens(recent[0]) + message_tokens(recent[1])
+            del recent[:2]
+
+        prompt_history = recent
+        if summary:
+            prompt_history = [
+                {"role": "user", "parts": [{"text": f"Summary of our conversation so far: {summary}"}]},
+                {"role": "model", "parts": [{"text": "Thanks, I'll keep that in mind."}]},
+            ] + prompt_history
+
+        prompt_tokens = (self.system_tokens + estimate_tokens(user_message)
+                         + sum(message_tokens(m) for m in prompt_history))
+        return prompt_history, prompt_tokens
+
+    def forget(self, session_id):
+        with self._lock:
+            self._summaries.pop(session_id, None)
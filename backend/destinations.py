@@ -0,0 +1,117 @@
+import base64
+import bisect
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flights import get_flights_entry
+
+ORIGIN_PATTERN = re.compile(r"[A-Z]{2}")
+
+
+def estimate_price(flight):
+    """Pseudo price, same rules the homepage used to apply in the browser."""
+    flight_info = flight.get("flight") or {}
+    arrival = flight.get("arrival") or {}
+    departure = flight.get("departure") or {}
+
+    if flight_info.get("distance"):
+        return round(flight_info["distance"])
+    if arrival.get("scheduled") and departure.get("scheduled"):
+        try:
+            duration = (datetime.fromisoformat(arrival["scheduled"])
+                        - datetime.fromisoformat(departure["scheduled"]))
+            return round(duration.total_seconds() / 3600 * 500)
+        except ValueError:
+            pass
+    digits = re.sub(r"\D", "", flight_info.get("number") or "")
+    return int(digits) if digits and int(digits) else 1000
+
+
+def aggregate_destinations(flights, origin):
+    """One compact entry per destination airport abroad, sorted by (price, airport)."""
+    destinations = {}
+    for flight in flights:
+        arrival = flight.get("arrival") or {}
+        airport = arrival.get("airport")
+        if not airport or airport in destinations or arrival.get("country_code") == origin:
+            continue
+        country = arrival.get("country")
+        destinations[airport] = {
+            "airport": airport,
+            "iata": arrival.get("iata"),
+            "city": airport + (f", {country}" if country else ""),
+            "price": estimate_price(flight),
+        }
+    return sorted(destinations.values(), key=lambda d: (d["price"], d["airport"]))
+
+
+class DestinationIndex:
+    """Precomputed destinations for one origin country.
+
+    Rebuilt only when the underlying flight data changes, i.e. once per
+    flight cache refresh. It doesn't keep a reference to that payload.
+    """
+
+    def __init__(self, source, origin):
+        self.items = aggregate_destinations(source.get("data") or [], origin)
+        self.keys = [(d["price"], d["airport"]) for d in self.items]
+        self.by_airport = {d["airport"]: d for d in self.items}
+        body = json.dumps(self.items, sort_keys=True).encode("utf-8")
+        self.etag = hashlib.sha1(body).hexdigest()[:16]
+
+    def page(self, cursor=None, limit=10):
+        """Keyset pagination: entries after the cursor, plus the cursor for the next page."""
+        start = bisect.bisect_right(self.keys, decode_cursor(cursor)) if cursor else 0
+        items = self.items[start:start + limit]
+        next_cursor = None
+        if start + limit < len(self.items):
+            next_cursor = encode_cursor(self.keys[start + limit - 1])
+        return items, next_cursor
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        price, airport = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    # Must compare with the (price, airport) keys, or bisect raises TypeError
+    if (not isinstance(price, (int, float)) or isinstance(price, bool)
+            or not isinstance(airport, str)):
+        raise ValueError("Invalid cursor")
+    return (price, airport)
+
+
+MAX_INDEXES = 64
+_indexes = OrderedDict()  # origin country -> (fetched_at of its flight data, DestinationIndex)
+_lock = threading.Lock()
+
+
+def get_destination_index(origin):
+    """Index for a two-letter origin country code, rebuilt when its flight data is refetched."""
+    if not ORIGIN_PATTERN.fullmatch(origin):
+        raise ValueError("origin must be a two-letter country code")
+    fetched_at, source = get_flights_entry({"dep_country": origin, "limit": 100})
+    with _lock:
+        cached = _indexes.get(origin)
+        if cached is not None and cached[0] == fetched_at:
+            _indexes.move_to_end(origin)
+            return cached[1]
+
+    index = DestinationIndex(source, origin)
+    with _lock:
+        # Don't replace an index built from newer data by a concurrent request
+        cached = _indexes.get(origin)
+        if cached is None or cached[0] < fetched_at:
+            _indexes[origin] = (fetched_at, index)
+        _indexes.move_to_end(origin)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
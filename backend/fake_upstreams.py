@@ -0,0 +1,308 @@
+"""Local stand-ins for Gemini and aviationstack, used by bench.py.
+
+FakeLLMServer and FakeFlightServer are plain HTTP servers with configurable
+latency, token rate and error injection. FakeGenerativeModel has the parts
+of the genai.GenerativeModel interface the backend uses and talks to a
+FakeLLMServer, so it can be patched in before app.py is imported.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from google.api_core import exceptions as api_exceptions
+
+WORDS = ("Marrakech", "beach", "winter", "Lisbon", "museum", "sunny", "families",
+         "budget", "Kyoto", "spring", "hiking", "Seville", "food", "islands")
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server:
+    handler = None
+    # Statuses used for injected errors
+    error_statuses = (500,)
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        # Statuses to return for the next requests, before error_rate applies
+        self.fail_next = []
+        self._lock = threading.Lock()
+        handler = type("Handler", (self.handler,), {"server_state": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def injected_error(self):
+        """Status code to fail this request with, or None."""
+        with self._lock:
+            self.requests += 1
+            if self.fail_next:
+                status = self.fail_next.pop(0)
+            elif self.error_rate and self.random.random() < self.error_rate:
+                status = self.random.choice(self.error_statuses)
+            else:
+                return None
+            self.errors += 1
+            return status
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _LLMHandler(_QuietHandler):
+    def do_POST(self):
+        state = self.server_state
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        time.sleep(state.latency)
+        status = state.injected_error()
+        if status:
+            self.send_json(status, {"error": f"injected {status}"})
+            return
+
+        prompt_tokens = request.get("prompt_tokens", 0)
+        words = [state.random.choice(WORDS) for _ in range(state.reply_tokens)]
+        delay = 1.0 / state.token_rate if state.token_rate else 0.0
+
+        if not request.get("stream"):
+            time.sleep(delay * len(words))
+            self.send_json(200, {"text": " ".join(words), "prompt_tokens": prompt_tokens,
+                                 "output_tokens": len(words)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for start in range(0, len(words), state.chunk_tokens):
+            chunk = words[start:start + state.chunk_tokens]
+            time.sleep(delay * len(chunk))
+            text = " ".join(chunk) + " "
+            self.wfile.write(f"data: {json.dumps({'text': text})}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        done = {"prompt_tokens": prompt_tokens, "output_tokens": len(words)}
+        self.wfile.write(f"data: {json.dumps(done)}\n\n".encode("utf-8"))
+
+
+class FakeLLMServer(_Server):
+    """Generates replies of reply_tokens words at token_rate tokens/second.
+
+    latency is added before the first token; error_rate is the share of
+    requests answered with a 429, 500 or 503.
+    """
+
+    handler = _LLMHandler
+    error_statuses = (429, 500, 503)
+
+    def __init__(self, latency=0.3, token_rate=50.0, reply_tokens=120, chunk_tokens=8,
+                 error_rate=0.0, **kwargs):
+        super().__init__(latency=latency, error_rate=error_rate, **kwargs)
+        self.token_rate = token_rate
+        self.reply_tokens = reply_tokens
+        self.chunk_tokens = chunk_tokens
+
+
+def make_flights(count, seed=0):
+    """Random flights in the aviationstack response format."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    airlines = (("Royal Air Maroc", "AT"), ("Air France", "AF"), ("Ryanair", "FR"),
+                ("Air Arabia", "G9"), ("Iberia", "IB"), ("easyJet", "U2"))
+    airports = (("Casablanca", "CMN", "Morocco", "MA"), ("Marrakech", "RAK", "Morocco", "MA"),
+                ("Paris Charles de Gaulle", "CDG", "France", "FR"), ("Madrid Barajas", "MAD", "Spain", "ES"),
+                ("London Gatwick", "LGW", "United Kingdom", "GB"), ("Lisbon", "LIS", "Portugal", "PT"),
+                ("Istanbul", "IST", "Turkey", "TR"), ("Dubai", "DXB", "United Arab Emirates", "AE"))
+    flights = []
+    for index in range(count):
+        airline, code = rng.choice(airlines)
+        departure, arrival = rng.sample(airports, 2)
+        scheduled = now + timedelta(minutes=rng.randint(-720, 720))
+        duration = rng.randint(60, 420)
+        flights.append({
+            "flight_status": rng.choice(("scheduled", "active", "landed", "cancelled")),
+            "airline": {"name": airline, "iata": code},
+            "flight": {"number": str(100 + index), "iata": f"{code}{100 + index}"},
+            "departure": {"airport": departure[0], "iata": departure[1], "country": departure[2],
+                          "country_code": departure[3], "scheduled": scheduled.isoformat(),
+                          "timezone": "UTC", "terminal": "1", "gate": "A1"},
+            "arrival": {"airport": arrival[0], "iata": arrival[1], "country": arrival[2],
+                        "country_code": arrival[3],
+                        "scheduled": (scheduled + timedelta(minutes=duration)).isoformat(),
+                        "timezone": "UTC", "terminal": "2", "gate": "B2"},
+            "duration": duration,
+        })
+    return flights
+
+
+class _FlightHandler(_QuietHandler):
+    def do_GET(self):
+        state = self.server_state
+        time.sleep(state.latency)
+        status = state.injected_error()
+        if status:
+            self.send_json(status, {"error": {"code": "internal_error", "info": "injected error"}})
+            return
+
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        flights = state.flights
+        if query.get("dep_country"):
+            flights = [f for f in flights if f["departure"]["country_code"] == query["dep_country"]]
+        if query.get("flight_status"):
+            flights = [f for f in flights if f["flight_status"] == query["flight_status"]]
+        if query.get("flight_iata"):
+            flights = [f for f in flights if f["flight"]["iata"] == query["flight_iata"]]
+        if query.get("airline_name"):
+            name = query["airline_name"].casefold()
+            flights = [f for f in flights if f["airline"]["name"].casefold() == name]
+
+        limit = int(query.get("limit", 100))
+        offset = int(query.get("offset", 0))
+        page = flights[offset:offset + limit]
+        self.send_json(200, {
+            "pagination": {"limit": limit, "offset": offset, "count": len(page), "total": len(flights)},
+            "data": page,
+        })
+
+
+class FakeFlightServer(_Server):
+    """Serves generated flights with aviationstack's query parameters and pagination."""
+
+    handler = _FlightHandler
+
+    def __init__(self, flights=500, latency=0.2, error_rate=0.0, **kwargs):
+        super().__init__(latency=latency, error_rate=error_rate, **kwargs)
+        self.flights = make_flights(flights)
+
+
+# Set by bench.py before the backend builds its models
+LLM_URL = None
+_http = requests.Session()
+
+
+class _Usage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+
+
+class _Response:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = usage
+
+
+def _raise_for_status(response):
+    if response.status_code >= 400:
+        # Same exception types the real client raises, so retry logic applies
+        raise api_exceptions.from_http_status(response.status_code, response.text)
+
+
+def _request(message, history, stream):
+    prompt_tokens = sum(len(part.get("text", "")) // 4
+                        for entry in history for part in entry.get("parts", []))
+    return _http.post(
+        f"{LLM_URL}/generate",
+        json={"message": message, "stream": stream, "prompt_tokens": prompt_tokens + len(message) // 4},
+        stream=stream,
+        timeout=60
+    )
+
+
+class _StreamResponse:
+    def __init__(self, response):
+        self._response = response
+        self.usage_metadata = None
+
+    def __iter__(self):
+        for line in self._response.iter_lines():
+            if not line.startswith(b"data: "):
+                continue
+            payload = json.loads(line[6:])
+            if "text" in payload:
+                yield _Response(payload["text"])
+            else:
+                self.usage_metadata = _Usage(payload["prompt_tokens"], payload["output_tokens"])
+                yield _Response("", self.usage_metadata)
+
+
+class _AsyncStreamResponse:
+    def __init__(self, response):
+        self._chunks = iter(_StreamResponse(response))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        chunk = await asyncio.to_thread(next, self._chunks, None)
+        if chunk is None:
+            raise StopAsyncIteration
+        return chunk
+
+
+class FakeChat:
+    def __init__(self, history):
+        self.history = list(history or [])
+
+    def send_message(self, message, stream=False, **kwargs):
+        response = _request(message, self.history, stream)
+        _raise_for_status(response)
+        if stream:
+            return _StreamResponse(response)
+        payload = response.json()
+        return _Response(payload["text"], _Usage(payload["prompt_tokens"], payload["output_tokens"]))
+
+    async def send_message_async(self, message, stream=False, **kwargs):
+        response = await asyncio.to_thread(_request, message, self.history, stream)
+        _raise_for_status(response)
+        if stream:
+            return _AsyncStreamResponse(response)
+        payload = response.json()
+        return _Response(payload["text"], _Usage(payload["prompt_tokens"], payload["output_tokens"]))
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel that calls a FakeLLMServer."""
+
+    def __init__(self, model_name=None, system_instruction=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def start_chat(self, history=None):
+        return FakeChat(history)
+
+    def generate_content(self, prompt, **kwargs):
+        return FakeChat([]).send_message(prompt)
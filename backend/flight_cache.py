@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _InFlight:
+    """A fetch that other requests for the same key can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.fetched_at = None
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Thread-safe TTL cache shared by all requests.
+
+    - Fresh entries (younger than ttl) are served directly.
+    - Stale entries (younger than ttl + stale_ttl) are served immediately
+      while a single background refresh runs.
+    - Concurrent misses for the same key are coalesced into one fetch.
+    """
+
+    def __init__(self, ttl=60, stale_ttl=300, max_entries=256, wait_timeout=30):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()  # key -> (fetched_at, value)
+        self._in_flight = {}  # key -> _InFlight
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.evictions = 0
+
+    def get(self, key, fetch, max_age=None):
+        """Return the cached value for key, calling fetch() only when needed.
+
+        With max_age, entries older than that are never served, not even
+        stale: the caller waits for a fresh fetch instead.
+        """
+        return self.get_entry(key, fetch, max_age)[1]
+
+    def get_entry(self, key, fetch, max_age=None):
+        """Like get(), but return (fetched_at, value).
+
+        fetched_at (time.monotonic()) identifies the fetch the value came from.
+        """
+        now = time.monotonic()
+        fresh_for = self.ttl if max_age is None else min(self.ttl, max_age)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age < fresh_for:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return entry
+                if max_age is None and age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    self._entries.move_to_end(key)
+                    if key not in self._in_flight:
+                        self._in_flight[key] = _InFlight()
+                        threading.Thread(
+                            target=self._refresh, args=(key, fetch), daemon=True
+                        ).start()
+                    return entry
+
+            self.misses += 1
+            in_flight = self._in_flight.get(key)
+            leader = in_flight is None
+            if leader:
+                in_flight = self._in_flight[key] = _InFlight()
+            else:
+                self.coalesced += 1
+
+        if leader:
+            self._refresh(key, fetch)
+        elif not in_flight.done.wait(self.wait_timeout):
+            raise TimeoutError("Timed out waiting for upstream response")
+
+        if in_flight.error is not None:
+            raise in_flight.error
+        return in_flight.fetched_at, in_flight.value
+
+    def _refresh(self, key, fetch):
+        with self._lock:
+            in_flight = self._in_flight[key]
+            self.upstream_calls += 1
+        try:
+            value = fetch()
+        except Exception as e:
+            with self._lock:
+                self.upstream_errors += 1
+                del self._in_flight[key]
+            in_flight.error = e
+            in_flight.done.set()
+            print(f"Upstream error for {key}: {e}")
+            return
+
+        fetched_at = time.monotonic()
+        with self._lock:
+            self._entries[key] = (fetched_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            del self._in_flight[key]
+        in_flight.fetched_at = fetched_at
+        in_flight.value = value
+        in_flight.done.set()
+
+    def stats(self):
+        served = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.stale_hits) / served if served else 0.0,
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,266 @@
+import bisect
+import hashlib
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from flights import normalize_params, get_flights
+
+FLIGHT_IATA_PATTERN = re.compile(r"^[A-Za-z0-9]{2}\d+$")
+
+# Sorted last when a flight has no scheduled time
+NO_TIME = float("inf")
+
+
+def parse_time(value):
+    if not value:
+        return NO_TIME
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return NO_TIME
+
+
+class FlightRecord:
+    """Compact copy of the aviationstack fields the flight list displays."""
+
+    __slots__ = (
+        "flight_iata", "flight_status", "airline_name", "airline_iata", "duration",
+        "dep_iata", "dep_airport", "dep_scheduled", "dep_timezone", "dep_terminal", "dep_gate",
+        "arr_iata", "arr_airport", "arr_scheduled", "arr_timezone", "arr_terminal", "arr_gate",
+    )
+
+    def __init__(self, flight):
+        airline = flight.get("airline") or {}
+        info = flight.get("flight") or {}
+        departure = flight.get("departure") or {}
+        arrival = flight.get("arrival") or {}
+
+        self.flight_iata = info.get("iata")
+        self.flight_status = flight.get("flight_status")
+        self.airline_name = airline.get("name")
+        self.airline_iata = airline.get("iata")
+        self.duration = flight.get("duration")
+        self.dep_iata = departure.get("iata")
+        self.dep_airport = departure.get("airport")
+        self.dep_scheduled = departure.get("scheduled")
+        self.dep_timezone = departure.get("timezone")
+        self.dep_terminal = departure.get("terminal")
+        self.dep_gate = departure.get("gate")
+        self.arr_iata = arrival.get("iata")
+        self.arr_airport = arrival.get("airport")
+        self.arr_scheduled = arrival.get("scheduled")
+        self.arr_timezone = arrival.get("timezone")
+        self.arr_terminal = arrival.get("terminal")
+        self.arr_gate = arrival.get("gate")
+
+    def to_dict(self):
+        """Same shape as an aviationstack flight, so the UI can render it unchanged."""
+        return {
+            "flight_status": self.flight_status,
+            "duration": self.duration,
+            "airline": {"name": self.airline_name, "iata": self.airline_iata},
+            "flight": {"iata": self.flight_iata},
+            "departure": {
+                "iata": self.dep_iata, "airport": self.dep_airport,
+                "scheduled": self.dep_scheduled, "timezone": self.dep_timezone,
+                "terminal": self.dep_terminal, "gate": self.dep_gate,
+            },
+            "arrival": {
+                "iata": self.arr_iata, "airport": self.arr_airport,
+                "scheduled": self.arr_scheduled, "timezone": self.arr_timezone,
+                "terminal": self.arr_terminal, "gate": self.arr_gate,
+            },
+        }
+
+
+class FlightSnapshot:
+    """Immutable set of flights with secondary indexes for the flight list queries.
+
+    Row ids are positions in self.records. Every ordering breaks ties on the
+    row id, so a given snapshot always returns the same pages.
+    """
+
+    SORT_KEYS = ("departure", "arrival")
+
+    def __init__(self, flights, fetched_at=None):
+        self.fetched_at = fetched_at or time.time()
+        self.records = [FlightRecord(flight) for flight in flights]
+        # Derived from the content, so every worker gives the same data the same version
+        content = "\n".join(f"{r.flight_iata}|{r.flight_status}|{r.dep_scheduled}|{r.arr_scheduled}"
+                            for r in self.records)
+        self.version = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+
+        # Columns of scheduled times, indexed by row id
+        self.times = {
+            "departure": [parse_time(r.dep_scheduled) for r in self.records],
+            "arrival": [parse_time(r.arr_scheduled) for r in self.records],
+        }
+
+        self.by_iata = {}
+        self.by_status = {}
+        airlines = []
+        for row, record in enumerate(self.records):
+            if record.flight_iata:
+                self.by_iata.setdefault(record.flight_iata.upper(), []).append(row)
+            self.by_status.setdefault(record.flight_status, []).append(row)
+            if record.airline_name:
+                airlines.append((record.airline_name.casefold(), row))
+
+        # Sorted airline names, for prefix search with bisect
+        airlines.sort()
+        self.airline_names = [name for name, _ in airlines]
+        self.airline_rows = [row for _, row in airlines]
+
+        # Rows of each status (None: every status) in global departure/arrival order,
+        # with their times
+        self.ordered = {}
+        groups = dict(self.by_status)
+        groups[None] = range(len(self.records))
+        for status, rows in groups.items():
+            for sort in self.SORT_KEYS:
+                column = self.times[sort]
+                ordered = sorted(rows, key=lambda row: (column[row], row))
+                self.ordered[(status, sort)] = (ordered, [column[row] for row in ordered])
+
+    def _search_rows(self, search):
+        if FLIGHT_IATA_PATTERN.match(search):
+            return set(self.by_iata.get(search.upper(), ()))
+        prefix = search.casefold()
+        start = bisect.bisect_left(self.airline_names, prefix)
+        end = bisect.bisect_left(self.airline_names, prefix + "\uffff")
+        return set(self.airline_rows[start:end])
+
+    def query(self, status=None, search="", sort="departure", after=None, offset=0, limit=10):
+        """Return (records, total) for one page of matching flights.
+
+        after drops flights departing at or before that timestamp.
+        """
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Unknown sort: {sort}")
+
+        departures = self.times["departure"]
+
+        if search:
+            rows = self._search_rows(search)
+            matches = [row for row in rows
+                       if (status is None or self.records[row].flight_status == status)
+                       and (after is None or after < departures[row] < NO_TIME)]
+            column = self.times[sort]
+            matches.sort(key=lambda row: (column[row], row))
+        else:
+            ordered, times = self.ordered.get((status, sort), ([], []))
+            if after is not None and sort == "departure":
+                # Already in departure order: skip the past with a binary search
+                start = bisect.bisect_right(times, after)
+                end = bisect.bisect_left(times, NO_TIME)
+                matches = ordered[start:end]
+            elif after is not None:
+                matches = [row for row in ordered if after < departures[row] < NO_TIME]
+            else:
+                matches = ordered
+
+        page = matches[offset:offset + limit]
+        return [self.records[row] for row in page], len(matches)
+
+
+class SnapshotExpired(Exception):
+    """The snapshot a client was paging through has been replaced twice since."""
+
+
+class FlightStore:
+    """Holds the current snapshot and reloads it on demand.
+
+    A request that finds the snapshot older than interval is still served
+    from it, and starts a single background reload. The previous snapshot is
+    kept as well, so a client paging through it can finish after one reload.
+    A reload that finds the same flights keeps the version.
+    """
+
+    def __init__(self, interval=300, pages=5, page_size=100, max_page_age=60):
+        self.interval = interval
+        self.pages = pages
+        self.page_size = page_size
+        # Oldest cached page a reload may reuse
+        self.max_page_age = max_page_age
+        self.snapshot = None
+        self.previous = None
+        self.refresh_errors = 0
+        self._lock = threading.Lock()
+        self._first_load = threading.Lock()
+        self._reloading = False
+
+    def load(self):
+        """Fetch a fresh set of flights and swap in a new snapshot."""
+        flights = []
+        for page in range(self.pages):
+            # Through the shared cache, so concurrent fetches are coalesced and
+            # counted, but never from a stale entry: that would be older than
+            # the snapshot being replaced
+            payload = get_flights(normalize_params({"limit": self.page_size,
+                                                    "offset": page * self.page_size}),
+                                  max_age=self.max_page_age)
+            data = payload.get("data") or []
+            flights.extend(data)
+            if len(data) < self.page_size:
+                break
+
+        snapshot = FlightSnapshot(flights)
+        with self._lock:
+            if self.snapshot is None or snapshot.version != self.snapshot.version:
+                self.previous = self.snapshot
+            # Same data: only fetched_at moves, clients paging through it carry on
+            self.snapshot = snapshot
+        return snapshot
+
+    def _reload(self):
+        try:
+            self.load()
+        except Exception as e:
+            self.refresh_errors += 1
+            print(f"Flight snapshot refresh failed: {e}")
+        finally:
+            self._reloading = False
+
+    def get_snapshot(self, version=None):
+        """Snapshot to serve, by default the current one.
+
+        The first call loads the snapshot. Passing the version of an older
+        snapshot returns it if it is still kept, else raises SnapshotExpired.
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            with self._first_load:
+                if self.snapshot is None:
+                    self.load()
+            snapshot = self.snapshot
+        elif time.time() - snapshot.fetched_at >= self.interval:
+            with self._lock:
+                start = not self._reloading
+                self._reloading = True
+            if start:
+                threading.Thread(target=self._reload, daemon=True).start()
+
+        if version is None or version == snapshot.version:
+            return snapshot
+        previous = self.previous
+        if previous is not None and version == previous.version:
+            return previous
+        raise SnapshotExpired(f"Snapshot {version} has expired, restart from the first page")
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            "flights": len(snapshot.records) if snapshot else 0,
+            "version": snapshot.version if snapshot else None,
+            "fetched_at": snapshot.fetched_at if snapshot else None,
+            "refresh_errors": self.refresh_errors,
+        }
+
+
+flight_store = FlightStore(
+    interval=float(os.getenv("FLIGHT_SNAPSHOT_INTERVAL", 300)),
+    pages=int(os.getenv("FLIGHT_SNAPSHOT_PAGES", 5))
+)
@@ -0,0 +1,79 @@
+import os
+
+import requests
+
+from flight_cache import TTLCache
+
+AVIATIONSTACK_URL = os.getenv("AVIATIONSTACK_URL", "http://api.aviationstack.com/v1/flights")
+
+# Query parameters passed through to aviationstack
+FLIGHT_PARAMS = ("dep_country", "flight_status", "flight_iata", "airline_name", "limit", "offset")
+
+
+class UpstreamError(Exception):
+    """aviationstack returned an error instead of flight data."""
+
+
+# Reuse connections to aviationstack across requests
+http = requests.Session()
+
+flight_cache = TTLCache(
+    ttl=float(os.getenv("FLIGHTS_CACHE_TTL", 60)),
+    stale_ttl=float(os.getenv("FLIGHTS_STALE_TTL", 300)),
+    max_entries=int(os.getenv("FLIGHTS_CACHE_SIZE", 256))
+)
+
+
+def normalize_params(args):
+    """Keep supported parameters in a canonical form so equivalent queries share a cache entry."""
+    params = {}
+    for name in FLIGHT_PARAMS:
+        value = " ".join(str(args.get(name) or "").split())
+        if not value:
+            continue
+        if name in ("dep_country", "flight_iata"):
+            value = value.upper()
+        elif name in ("flight_status", "airline_name"):
+            value = value.casefold()
+        elif name == "limit":
+            value = min(max(int(value), 1), 100)
+        elif name == "offset":
+            value = max(int(value), 0)
+        params[name] = value
+    return params
+
+
+def cache_key(params):
+    return tuple(sorted(params.items()))
+
+
+def fetch_flights_upstream(params):
+    try:
+        response = http.get(
+            AVIATIONSTACK_URL,
+            params={"access_key": os.getenv("AVIATIONSTACK_API_KEY"), **params},
+            timeout=10
+        )
+        response.raise_for_status()
+        payload = response.json()
+    except requests.RequestException as e:
+        # requests puts the URL, access key included, in its messages: keep only the status
+        status = e.response.status_code if e.response is not None else None
+        message = f"aviationstack returned HTTP {status}" if status else "aviationstack is unreachable"
+        raise UpstreamError(message) from None
+    if payload.get("error"):
+        raise UpstreamError(payload["error"].get("info") or payload["error"].get("message"))
+    return payload
+
+
+def get_flights(params, max_age=None):
+    """Flight data for normalized params, served from the shared cache.
+
+    max_age (seconds) skips stale entries, see TTLCache.get.
+    """
+    return get_flights_entry(params, max_age)[1]
+
+
+def get_flights_entry(params, max_age=None):
+    """(fetched_at, flight data) for normalized params, see TTLCache.get_entry."""
+    return flight_cache.get_entry(cache_key(params), lambda: fetch_flights_upstream(params), max_age)
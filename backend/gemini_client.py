@@ -0,0 +1,121 @@
+import asyncio
+import random
+import weakref
+from contextlib import asynccontextmanager
+
+
+class Overloaded(Exception):
+    """Raised when too many requests are already waiting for the model."""
+
+
+def is_retryable(error):
+    """429s, 5xx responses and timeouts are worth retrying; anything else is not."""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and (code == 429 or 500 <= code < 600)
+
+
+class AsyncGeminiClient:
+    """Concurrency-limited wrapper around the async Gemini chat API.
+
+    At most max_concurrency calls run at once and at most max_queue more may
+    wait, for a slot or for an earlier request in the same session; beyond
+    that requests fail fast with Overloaded. Requests are admitted with
+    reserve(), before they wait on anything. Calls are bounded by timeout and
+    retried with jittered exponential backoff.
+
+    The model only needs start_chat(history=...) returning an object with
+    send_message_async(), so a fake model can stand in for Gemini in tests.
+    """
+
+    def __init__(self, model, max_concurrency=8, max_queue=32, timeout=30.0,
+                 retries=3, backoff_base=0.5, backoff_max=8.0):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = None
+        self._pending = 0
+        # One lock per session; entries disappear once no request holds them
+        self._session_locks = weakref.WeakValueDictionary()
+
+    @property
+    def semaphore(self):
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @property
+    def pending(self):
+        """Admitted requests: running, or waiting for their session or a slot."""
+        return self._pending
+
+    def session_lock(self, session_id):
+        """Lock that serializes requests within one session."""
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_id] = lock
+        return lock
+
+    @asynccontextmanager
+    async def reserve(self, session_id):
+        """Admit a request, then hold its session's lock until it is done.
+
+        Raises Overloaded straight away when the queue is full, including
+        when the request would only be waiting behind its own session.
+        """
+        if self._pending >= self.max_concurrency + self.max_queue:
+            raise Overloaded("Too many requests in flight, try again later")
+        self._pending += 1
+        try:
+            async with self.session_lock(session_id):
+                yield
+        finally:
+            self._pending -= 1
+
+    def _backoff(self, attempt):
+        # "Full jitter": sleep anywhere between 0 and the exponential cap
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _call(self, history, message, **kwargs):
+        for attempt in range(self.retries + 1):
+            chat = self.model.start_chat(history=history)
+            try:
+                return await asyncio.wait_for(
+                    chat.send_message_async(message, **kwargs), self.timeout
+                )
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                print(f"Gemini call failed ({e!r}), retrying")
+                await asyncio.sleep(self._backoff(attempt))
+
+    async def send_message(self, history, message, **kwargs):
+        """Send one message and return the complete response.
+
+        Call it within reserve() so the request counts against the queue.
+        """
+        async with self.semaphore:
+            return await self._call(history, message, **kwargs)
+
+    async def stream_message(self, history, message, **kwargs):
+        """Yield response chunks as they arrive.
+
+        Only opening the stream is retried; once chunks have been sent a
+        failure is passed on to the caller. Call it within reserve().
+        """
+        async with self.semaphore:
+            response = await self._call(history, message, stream=True, **kwargs)
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                except StopAsyncIteration:
+                    break
+                yield chunk
@@ -0,0 +1,184 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+def normalize_prompt(text):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.casefold()).split())
+
+
+def char_ngrams(text, n=3):
+    padded = f" {text} "
+    return Counter(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+
+
+def cosine(a, b):
+    dot = sum(count * b.get(gram, 0) for gram, count in a.items())
+    norm = math.sqrt(sum(c * c for c in a.values()) * sum(c * c for c in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def words_match(a, b, threshold=0.5, n=3):
+    """True if every word of either prompt is in the other or has a close spelling there.
+
+    Lets "destination"/"destinations" or "Marakech"/"Marrakech" through, but
+    not "June"/"July" or "winter"/"summer", which score high on the whole
+    prompt only because the rest of it is identical.
+    """
+    words_a, words_b = set(a.split()), set(b.split())
+    for missing, other in ((words_a - words_b, words_b), (words_b - words_a, words_a)):
+        for word in missing:
+            grams = char_ngrams(word, n)
+            if not any(cosine(grams, char_ngrams(candidate, n)) >= threshold for candidate in other):
+                return False
+    return True
+
+
+class _Entry:
+    __slots__ = ("prompt", "response", "ngrams", "norm", "created", "latency")
+
+    def __init__(self, prompt, response, ngrams, latency):
+        self.prompt = prompt
+        self.response = response
+        self.ngrams = ngrams
+        self.norm = math.sqrt(sum(count * count for count in ngrams.values()))
+        self.created = time.monotonic()
+        self.latency = latency
+
+
+class ResponseCache:
+    """Cache of model replies to first-turn prompts.
+
+    Prompts are matched exactly after normalization, or else by cosine
+    similarity of their character n-grams (through an inverted n-gram index)
+    when it reaches threshold and every differing word has a close
+    counterpart (word_threshold, see words_match). Only use it for prompts
+    without chat history: a cached reply can't take earlier turns into account.
+
+    Tuning: raising threshold only trades misses for wrong replies on prompts
+    that differ by one short word. To tune, replay logged first-turn prompts
+    and compare similar_hits in stats() with a review of the matched pairs.
+    Lower word_threshold to accept more spelling variants, raise it to accept
+    fewer.
+    """
+
+    def __init__(self, threshold=0.9, ttl=3600, max_entries=500, ngram_size=3,
+                 word_threshold=0.5):
+        self.threshold = threshold
+        self.word_threshold = word_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.ngram_size = ngram_size
+        self._entries = OrderedDict()  # normalized prompt -> _Entry
+        self._index = {}  # n-gram -> set of normalized prompts containing it
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for gram in entry.ngrams:
+            keys = self._index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[gram]
+
+    def _similar(self, prompt, ngrams):
+        norm = math.sqrt(sum(count * count for count in ngrams.values()))
+        if not norm:
+            return None, 0.0
+        # Only prompts sharing at least one n-gram can score above zero
+        candidates = set()
+        for gram in ngrams:
+            candidates.update(self._index.get(gram, ()))
+
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            entry = self._entries[key]
+            dot = sum(count * entry.ngrams.get(gram, 0) for gram, count in ngrams.items())
+            score = dot / (norm * entry.norm)
+            if score > best_score and score >= self.threshold and words_match(
+                    prompt, key, self.word_threshold, self.ngram_size):
+                best_key, best_score = key, score
+        return best_key, best_score
+
+    def get(self, prompt):
+        """Return the cached reply for prompt, or None."""
+        key = normalize_prompt(prompt)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created < self.ttl:
+                self.exact_hits += 1
+            else:
+                if entry is not None:
+                    self._remove(key)
+                key, _ = self._similar(key, char_ngrams(key, self.ngram_size))
+                entry = self._entries.get(key)
+                if entry is not None and now - entry.created >= self.ttl:
+                    self._remove(key)
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    return None
+                self.similar_hits += 1
+
+            self._entries.move_to_end(key)
+            self.saved_seconds += entry.latency
+            return entry.response
+
+    def put(self, prompt, response, latency):
+        """Store a reply along with how long the model took to produce it."""
+        key = normalize_prompt(prompt)
+        if not key:
+            return
+        ngrams = char_ngrams(key, self.ngram_size)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(prompt, response, ngrams, latency)
+            for gram in ngrams:
+                self._index.setdefault(gram, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def bypass(self):
+        """Count a request that skipped the cache because history matters."""
+        self.bypassed += 1
+
+    def stats(self):
+        hits = self.exact_hits + self.similar_hits
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "hit_ratio": hits / (hits + self.misses) if hits + self.misses else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "saved_seconds_per_hit": round(self.saved_seconds / hits, 3) if hits else 0.0,
+        }
+
+
+def create_response_cache():
+    """ResponseCache configured from the environment, or None unless RESPONSE_CACHE=1."""
+    if os.getenv("RESPONSE_CACHE", "0") != "1":
+        return None
+    return ResponseCache(
+        threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", 0.9)),
+        word_threshold=float(os.getenv("RESPONSE_CACHE_WORD_THRESHOLD", 0.5)),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", 3600)),
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", 500))
+    )
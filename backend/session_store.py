@@ -0,0 +1,222 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+def history_size(history):
+    """Approximate size of a chat history in bytes (as stored, JSON encoded)."""
+    return len(json.dumps(history).encode("utf-8"))
+
+
+def trim_to_budget(history, max_bytes):
+    """Drop the oldest messages until the history fits in max_bytes."""
+    if not max_bytes:
+        return history
+    history = list(history)
+    while history and history_size(history) > max_bytes:
+        # Drop a full user/model exchange at a time so roles stay paired
+        del history[:2]
+    return history
+
+
+class SessionStore(ABC):
+    """Base class for chat history storage.
+
+    Every backend keeps hit, miss and eviction counters, exposed by stats().
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abstractmethod
+    def get(self, session_id):
+        """Return a copy of the stored history, or an empty list."""
+
+    @abstractmethod
+    def save(self, session_id, history):
+        """Store history, trimmed to the per-session byte budget."""
+
+    @abstractmethod
+    def delete(self, session_id):
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        pass
+
+    def stats(self):
+        return {
+            "backend": type(self).__name__,
+            "sessions": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU store with idle expiry and a per-session byte budget."""
+
+    def __init__(self, max_sessions=1000, ttl=1800, max_bytes=64 * 1024):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()  # session_id -> (last_used, history)
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        # Entries are kept in least-recently-used order, so stop at the first live one
+        while self._sessions:
+            session_id, (last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used < self.ttl:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return []
+            self.hits += 1
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            return list(entry[1])
+
+    def save(self, session_id, history):
+        history = trim_to_budget(history, self.max_bytes)
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (now, history)
+            self._sessions.move_to_end(session_id)
+            self._expire(now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite-backed store so history survives restarts and is shared by workers.
+
+    Counters are per process; the session count is read from the database.
+    """
+
+    def __init__(self, path="chat_sessions.db", max_sessions=10000, ttl=86400,
+                 max_bytes=64 * 1024):
+        super().__init__()
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        # Counters are updated from many request threads
+        self._counter_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " history TEXT NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)"
+            )
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads, keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT history, last_used FROM sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None or now - row[1] >= self.ttl:
+            with self._counter_lock:
+                self.misses += 1
+            return []
+        with self._counter_lock:
+            self.hits += 1
+        with conn:
+            conn.execute(
+                "UPDATE sessions SET last_used = ? WHERE session_id = ?",
+                (now, session_id),
+            )
+        return json.loads(row[0])
+
+    def save(self, session_id, history):
+        history = trim_to_budget(history, self.max_bytes)
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, history, last_used) VALUES (?, ?, ?)"
+                " ON CONFLICT(session_id) DO UPDATE SET"
+                " history = excluded.history, last_used = excluded.last_used",
+                (session_id, json.dumps(history), now),
+            )
+            expired = conn.execute(
+                "DELETE FROM sessions WHERE last_used < ?", (now - self.ttl,)
+            ).rowcount
+            overflow = conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                " SELECT session_id FROM sessions ORDER BY last_used DESC"
+                " LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            ).rowcount
+        with self._counter_lock:
+            self.evictions += expired + overflow
+
+    def delete(self, session_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store():
+    """Build the session store selected by the SESSION_STORE environment variable."""
+    backend = os.getenv("SESSION_STORE", "memory")
+    max_bytes = int(os.getenv("SESSION_MAX_BYTES", 64 * 1024))
+
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            path=os.getenv("SESSION_DB_PATH", "chat_sessions.db"),
+            max_sessions=int(os.getenv("SESSION_MAX", 10000)),
+            ttl=float(os.getenv("SESSION_TTL", 86400)),
+            max_bytes=max_bytes,
+        )
+    if backend == "memory":
+        return MemorySessionStore(
+            max_sessions=int(os.getenv("SESSION_MAX", 1000)),
+            ttl=float(os.getenv("SESSION_TTL", 1800)),
+            max_bytes=max_bytes,
+        )
+    raise ValueError(f"Unknown SESSION_STORE: {backend}")
@@ -0,0 +1,170 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("quart")
+genai = pytest.importorskip("google.generativeai")
+from google.api_core import exceptions as api_exceptions
+
+import fake_upstreams
+from fake_upstreams import FakeLLMServer, FakeFlightServer, FakeGenerativeModel
+from gemini_client import AsyncGeminiClient
+
+
+@pytest.fixture(scope="module")
+def llm():
+    server = FakeLLMServer(latency=0.0, token_rate=0, reply_tokens=5, seed=0).start()
+    fake_upstreams.LLM_URL = server.url
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="module")
+def asgi(llm):
+    os.environ.setdefault("GEMINI_API_KEY", "test")
+    genai.GenerativeModel = FakeGenerativeModel
+    import asgi
+    return asgi
+
+
+def make_client(**kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    return AsyncGeminiClient(FakeGenerativeModel(), **kwargs)
+
+
+def test_retries_on_429_and_5xx(llm):
+    client = make_client(retries=3)
+    llm.fail_next = [429, 503]
+    errors = llm.errors
+
+    response = asyncio.run(client.send_message([], "hello"))
+
+    assert response.text
+    assert llm.errors == errors + 2
+
+
+def test_gives_up_after_the_last_retry(llm):
+    client = make_client(retries=2)
+    llm.fail_next = [500, 500, 500]
+
+    with pytest.raises(api_exceptions.InternalServerError):
+        asyncio.run(client.send_message([], "hello"))
+
+
+def test_client_errors_are_not_retried(llm):
+    client = make_client(retries=3)
+    llm.fail_next = [400]
+    requests = llm.requests
+
+    with pytest.raises(api_exceptions.BadRequest):
+        asyncio.run(client.send_message([], "hello"))
+    assert llm.requests == requests + 1
+
+
+def test_slow_upstream_times_out(llm, monkeypatch):
+    monkeypatch.setattr(llm, "latency", 0.5)
+    client = make_client(timeout=0.05, retries=0)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.send_message([], "hello"))
+
+
+def test_full_queue_fails_fast_with_503(asgi, llm, monkeypatch):
+    monkeypatch.setattr(llm, "latency", 0.2)
+    monkeypatch.setattr(asgi, "client", make_client(max_concurrency=1, max_queue=0))
+
+    async def run():
+        test_client = asgi.app.test_client()
+        return await asyncio.gather(*[
+            test_client.post("/api/chat", json={"message": "hi", "sessionId": f"queue-{i}"})
+            for i in range(3)
+        ])
+
+    statuses = sorted(response.status_code for response in asyncio.run(run()))
+    assert statuses == [200, 503, 503]
+
+
+def test_requests_waiting_on_their_session_count_against_the_queue(asgi, llm, monkeypatch):
+    monkeypatch.setattr(llm, "latency", 0.1)
+    monkeypatch.setattr(asgi, "client", make_client(max_concurrency=1, max_queue=0))
+
+    async def run():
+        test_client = asgi.app.test_client()
+        return await asyncio.gather(*[
+            test_client.post("/api/chat", json={"message": f"hi {i}", "sessionId": "busy"})
+            for i in range(10)
+        ])
+
+    statuses = sorted(response.status_code for response in asyncio.run(run()))
+    assert statuses == [200] + [503] * 9
+
+
+def test_messages_in_one_session_do_not_interleave(asgi, monkeypatch):
+    monkeypatch.setattr(asgi, "client", make_client())
+    messages = [f"message {i}" for i in range(5)]
+
+    async def run():
+        test_client = asgi.app.test_client()
+        return await asyncio.gather(*[
+            test_client.post("/api/chat", json={"message": message, "sessionId": "serial"})
+            for message in messages
+        ])
+
+    assert all(response.status_code == 200 for response in asyncio.run(run()))
+    history = asgi.session_store.get("serial")
+    assert [entry["role"] for entry in history] == ["user", "model"] * len(messages)
+    assert sorted(entry["parts"][0]["text"] for entry in history[::2]) == messages
+
+
+def test_stream_endpoint_sends_chunks_then_done(asgi, monkeypatch):
+    monkeypatch.setattr(asgi, "client", make_client())
+
+    async def run():
+        response = await asgi.app.test_client().post(
+            "/api/chat/stream", json={"message": "hi", "sessionId": "stream"}
+        )
+        return (await response.get_data()).decode()
+
+    body = asyncio.run(run())
+    assert body.startswith("data: ")
+    assert "event: done" in body
+    assert len(asgi.session_store.get("stream")) == 2
+
+
+def test_flight_routes_are_served_from_the_asgi_app(asgi, monkeypatch):
+    import flights
+    server = FakeFlightServer(flights=50, latency=0.0).start()
+    monkeypatch.setattr(flights, "AVIATIONSTACK_URL", f"{server.url}/v1/flights")
+
+    async def run():
+        test_client = asgi.app.test_client()
+        return [await test_client.get(path, query_string=query) for path, query in (
+            ("/api/flights", {"dep_country": "MA"}),
+            ("/api/destinations", {"origin": "MA"}),
+            ("/api/flights/search", {"upcoming": "0"}),
+            ("/api/flights/stats", {}),
+        )]
+
+    try:
+        responses = asyncio.run(run())
+    finally:
+        server.stop()
+    assert [response.status_code for response in responses] == [200] * 4
+    assert all(response.headers["Access-Control-Allow-Origin"] == "*" for response in responses)
+
+
+def test_empty_streamed_reply_is_an_error_and_not_stored(asgi, llm, monkeypatch):
+    monkeypatch.setattr(llm, "reply_tokens", 0)
+    monkeypatch.setattr(asgi, "client", make_client())
+
+    async def run():
+        response = await asgi.app.test_client().post(
+            "/api/chat/stream", json={"message": "hi", "sessionId": "empty"}
+        )
+        return (await response.get_data()).decode()
+
+    body = asyncio.run(run())
+    assert "event: error" in body
+    assert "event: done" not in body
+    assert asgi.session_store.get("empty") == []
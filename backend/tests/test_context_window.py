@@ -0,0 +1,118 @@
+from context_window import ContextWindow
+
+
+def exchange(index):
+    return [
+        {"role": "user", "parts": [{"text": f"question {index} " + "x" * 100}]},
+        {"role": "model", "parts": [{"text": f"answer {index} " + "y" * 200}]},
+    ]
+
+
+def make_window(calls):
+    def summarize(previous, messages, max_tokens):
+        calls.append((previous, len(messages)))
+        return f"summary {len(calls)}"
+
+    return ContextWindow(token_budget=1000, summarize=summarize)
+
+
+def test_message_length_does_not_move_the_window():
+    calls = []
+    window = make_window(calls)
+    history = [message for index in range(12) for message in exchange(index)]
+
+    for user_message in ("short", "z" * 600, "short", "z" * 600):
+        window.build("s", history, user_message)
+
+    # Summarized once, then served from the cache
+    assert len(calls) == 1
+
+
+def test_summary_is_only_extended_with_newly_folded_turns():
+    calls = []
+    window = make_window(calls)
+    history = [message for index in range(12) for message in exchange(index)]
+    window.build("s", history, "hi")
+    folded = calls[0][1]
+
+    history += exchange(12)
+    window.build("s", history, "hi")
+
+    assert calls[1] == ("summary 1", 2)
+    assert folded + 2 <= len(history)
+
+
+def test_trimmed_history_rolls_forward_from_the_previous_summary():
+    calls = []
+    window = make_window(calls)
+    history = [message for index in range(12) for message in exchange(index)]
+    window.build("s", history, "hi")
+
+    # The session store dropped the oldest turns, including the last folded one
+    trimmed = history[-12:] + exchange(12)
+    prompt_history, _ = window.build("s", trimmed, "hi")
+
+    assert calls[-1][0] == "summary 1"
+    assert "summary" in prompt_history[0]["parts"][0]["text"]
+
+
+def test_short_history_is_sent_verbatim():
+    calls = []
+    window = make_window(calls)
+    history = exchange(0)
+
+    prompt_history, prompt_tokens = window.build("s", history, "hi")
+
+    assert prompt_history == history
+    assert prompt_tokens > 0
+    assert calls == []
+
+
+def repeated_exchange(index):
+    return [
+        {"role": "user", "parts": [{"text": f"question {index} " + "x" * 100}]},
+        {"role": "model", "parts": [{"text": "Sure! " + "y" * 200}]},
+    ]
+
+
+def test_repeated_replies_do_not_move_the_boundary():
+    calls = []
+    window = make_window(calls)
+    history = [message for index in range(12) for message in repeated_exchange(index)]
+    window.build("s", history, "hi")
+    folded = calls[0][1]
+
+    history += repeated_exchange(12)
+    prompt_history, _ = window.build("s", history, "hi")
+
+    # The two newly folded messages are summarized, every other turn is still sent
+    assert calls[1] == ("summary 1", 2)
+    assert prompt_history[2:] == history[folded + 2:]
+
+
+def test_trimmed_history_with_repeated_replies_keeps_every_turn():
+    calls = []
+    window = make_window(calls)
+    history = [message for index in range(12) for message in repeated_exchange(index)]
+    window.build("s", history, "hi")
+    folded = calls[0][1]
+
+    # The store dropped two exchanges, then one more was added
+    trimmed = history[4:] + repeated_exchange(12)
+    prompt_history, _ = window.build("s", trimmed, "hi")
+
+    assert calls[1] == ("summary 1", 2)
+    assert prompt_history[2:] == trimmed[folded - 4 + 2:]
+
+
+def test_long_message_stays_within_the_budget():
+    calls = []
+    window = make_window(calls)
+    history = [message for index in range(12) for message in exchange(index)]
+
+    _, short_tokens = window.build("s", history, "hi")
+    prompt_history, long_tokens = window.build("s", history, "z" * 2000)
+
+    assert long_tokens <= window.token_budget
+    assert len(calls) == 1
+    assert prompt_history[0]["parts"][0]["text"].startswith("Summary")
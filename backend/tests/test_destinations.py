@@ -0,0 +1,82 @@
+import base64
+import json
+
+import pytest
+
+import destinations
+from destinations import DestinationIndex, decode_cursor, encode_cursor, get_destination_index
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode("ascii")
+
+
+def make_flights(count):
+    return [{
+        "flight": {"number": str(index), "distance": 100 + index % 5},
+        "arrival": {"airport": f"Airport {index}", "iata": f"A{index:02d}", "country_code": "FR"},
+    } for index in range(count)]
+
+
+def make_index(count):
+    return DestinationIndex({"data": make_flights(count)}, "MA")
+
+
+def test_pages_follow_each_other_without_duplicates():
+    index = make_index(25)
+    seen = []
+    cursor = None
+    while True:
+        items, cursor = index.page(cursor, 10)
+        seen.extend(item["airport"] for item in items)
+        if cursor is None:
+            break
+    assert seen == [item["airport"] for item in index.items]
+
+
+def test_cursor_round_trips():
+    assert decode_cursor(encode_cursor((120, "Lisbon"))) == (120, "Lisbon")
+
+
+@pytest.mark.parametrize("cursor", [
+    raw_cursor(["a", "b"]),
+    raw_cursor([100, 5]),
+    raw_cursor([True, "Lisbon"]),
+    raw_cursor([100]),
+    raw_cursor({"price": 100}),
+    "not base64!",
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        make_index(5).page(cursor, 2)
+
+
+@pytest.mark.parametrize("origin", ["", "M", "MAR", "12", "M%"])
+def test_origin_must_be_a_country_code(origin):
+    with pytest.raises(ValueError):
+        get_destination_index(origin)
+
+
+def test_index_is_rebuilt_only_when_the_flight_data_is_refetched(monkeypatch):
+    entry = {"value": (1.0, {"data": make_flights(5)})}
+    monkeypatch.setattr(destinations, "get_flights_entry", lambda params: entry["value"])
+    monkeypatch.setattr(destinations, "_indexes", type(destinations._indexes)())
+
+    first = get_destination_index("MA")
+    assert get_destination_index("MA") is first
+
+    entry["value"] = (2.0, {"data": make_flights(8)})
+    rebuilt = get_destination_index("MA")
+    assert rebuilt is not first
+    assert len(rebuilt.items) == 8
+
+
+def test_index_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(destinations, "get_flights_entry", lambda params: (1.0, {"data": make_flights(2)}))
+    monkeypatch.setattr(destinations, "_indexes", type(destinations._indexes)())
+    monkeypatch.setattr(destinations, "MAX_INDEXES", 3)
+
+    for origin in ("AA", "BB", "CC", "DD"):
+        get_destination_index(origin)
+
+    assert list(destinations._indexes) == ["BB", "CC", "DD"]
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from flight_cache import TTLCache
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = TTLCache(ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("key", fetch)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_stale_entry_is_served_while_it_refreshes():
+    cache = TTLCache(ttl=0.05, stale_ttl=60)
+    values = iter(["old", "new"])
+    cache.get("key", lambda: next(values))
+    time.sleep(0.06)
+
+    assert cache.get("key", lambda: next(values)) == "old"
+    deadline = time.monotonic() + 2
+    while cache.get("key", lambda: "unused") != "new":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert cache.stats()["stale_hits"] >= 1
+
+
+def test_failed_fetch_is_raised_to_every_waiter_and_not_cached():
+    cache = TTLCache(ttl=60)
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get("key", fail)
+    assert cache.get("key", lambda: "value") == "value"
+    assert cache.stats()["upstream_errors"] == 1
+
+
+def test_oldest_entries_are_evicted():
+    cache = TTLCache(ttl=60, max_entries=2)
+    for key in "abc":
+        cache.get(key, lambda: key)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_max_age_skips_stale_entries():
+    cache = TTLCache(ttl=60, stale_ttl=60)
+    cache.get("key", lambda: "old")
+    time.sleep(0.02)
+
+    assert cache.get("key", lambda: "new") == "old"
+    assert cache.get("key", lambda: "new", max_age=0.01) == "new"
+
+
+def test_entry_time_identifies_the_fetch():
+    cache = TTLCache(ttl=60)
+    first = cache.get_entry("key", lambda: "value")
+
+    assert cache.get_entry("key", lambda: "unused") == first
+    assert cache.get_entry("key", lambda: "new", max_age=0)[0] > first[0]
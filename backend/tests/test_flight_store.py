@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+import flights
+import flight_store as flight_store_module
+from fake_upstreams import make_flights
+from flight_cache import TTLCache
+from flight_store import FlightStore, SnapshotExpired
+
+
+class FakePages:
+    """Stands in for flights.get_flights, serving 250 generated flights."""
+
+    def __init__(self):
+        self.flights = make_flights(250)
+        self.calls = []
+        self.released = threading.Event()
+        self.released.set()
+
+    def __call__(self, params, max_age=None):
+        self.released.wait(2)
+        self.calls.append(params)
+        offset = params.get("offset", 0)
+        return {"data": self.flights[offset:offset + params["limit"]]}
+
+    def change(self):
+        """Make the next reload see different flights."""
+        self.flights = make_flights(250, seed=len(self.calls))
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    fake = FakePages()
+    monkeypatch.setattr(flight_store_module, "get_flights", fake)
+    yield fake
+    fake.released.set()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_pages_are_fetched_through_get_flights(pages):
+    snapshot = FlightStore(interval=60, pages=5).get_snapshot()
+
+    assert len(snapshot.records) == 250
+    # Normalized like request parameters, so they share the cache entries; the
+    # third page is short, so paging stops there
+    assert pages.calls == [{"limit": 100}, {"limit": 100, "offset": 100},
+                           {"limit": 100, "offset": 200}]
+
+
+def test_fresh_snapshot_is_not_reloaded(pages):
+    store = FlightStore(interval=60)
+    first = store.get_snapshot()
+    calls = len(pages.calls)
+
+    assert store.get_snapshot() is first
+    time.sleep(0.05)
+    assert len(pages.calls) == calls
+
+
+def test_old_snapshot_is_served_while_one_reload_runs(pages):
+    store = FlightStore(interval=60)
+    first = store.get_snapshot()
+    first.fetched_at -= 120
+    pages.change()
+    pages.released.clear()
+    threads = threading.active_count()
+
+    # Every request gets the old snapshot straight away; only one reload starts
+    assert all(store.get_snapshot() is first for _ in range(10))
+    assert threading.active_count() == threads + 1
+
+    pages.released.set()
+    wait_for(lambda: store.snapshot is not first)
+    assert store.snapshot.version != first.version
+
+
+def test_version_depends_only_on_the_flights(pages):
+    # e.g. two workers loading the same data
+    first = FlightStore(interval=60).get_snapshot()
+    time.sleep(0.01)
+    second = FlightStore(interval=60).get_snapshot()
+
+    assert first.version == second.version
+    assert first.fetched_at != second.fetched_at
+
+
+def test_reload_with_the_same_flights_keeps_the_version(pages):
+    store = FlightStore(interval=60)
+    first = store.get_snapshot()
+    reloaded = store.load()
+
+    assert reloaded.version == first.version
+    assert reloaded.fetched_at > first.fetched_at
+    assert store.previous is None
+    assert store.get_snapshot(first.version) is reloaded
+
+
+def test_previous_version_is_kept_for_one_reload(pages):
+    store = FlightStore(interval=60)
+    first = store.get_snapshot()
+    pages.change()
+    second = store.load()
+
+    assert store.get_snapshot(first.version) is first
+    assert store.get_snapshot(second.version) is second
+
+    pages.change()
+    store.load()
+    with pytest.raises(SnapshotExpired):
+        store.get_snapshot(first.version)
+
+
+def test_reload_does_not_reuse_stale_cached_pages(monkeypatch):
+    generation = {"flights": make_flights(50, seed=1)}
+    monkeypatch.setattr(flights, "flight_cache", TTLCache(ttl=0.05, stale_ttl=60))
+    monkeypatch.setattr(flights, "fetch_flights_upstream", lambda params: {"data": generation["flights"]})
+
+    store = FlightStore(interval=60)
+    first = store.get_snapshot()
+    generation["flights"] = make_flights(50, seed=2)
+    time.sleep(0.06)
+
+    assert store.load().version != first.version
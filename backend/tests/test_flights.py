@@ -0,0 +1,60 @@
+import os
+import socket
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+import flights
+from fake_upstreams import FakeFlightServer
+
+SECRET = "SECRETKEY123"
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/v1/flights"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    os.environ.setdefault("GEMINI_API_KEY", "test")
+    monkeypatch.setenv("AVIATIONSTACK_API_KEY", SECRET)
+    import app
+    return app.app.test_client()
+
+
+@pytest.fixture
+def failing_server():
+    server = FakeFlightServer(flights=10, latency=0.0).start()
+    yield server
+    server.stop()
+
+
+@pytest.mark.parametrize("origin", ["DE", "IT"])
+def test_unreachable_upstream_does_not_leak_the_key(client, monkeypatch, capsys, origin):
+    monkeypatch.setattr(flights, "AVIATIONSTACK_URL", closed_port_url())
+
+    responses = [client.get(f"/api/flights?dep_country={origin}"),
+                 client.get(f"/api/destinations?origin={origin}")]
+
+    for response in responses:
+        assert response.status_code == 502
+        assert SECRET not in response.get_data(as_text=True)
+    assert SECRET not in capsys.readouterr().out
+
+
+def test_upstream_error_status_does_not_leak_the_key(client, monkeypatch, capsys, failing_server):
+    monkeypatch.setattr(flights, "AVIATIONSTACK_URL", f"{failing_server.url}/v1/flights")
+    failing_server.fail_next = [500]
+
+    with pytest.raises(flights.UpstreamError, match="HTTP 500") as error:
+        flights.fetch_flights_upstream({"dep_country": "ES"})
+    assert SECRET not in str(error.value)
+
+    failing_server.fail_next = [500]
+    response = client.get("/api/flights?dep_country=PT")
+    assert response.status_code == 502
+    assert SECRET not in response.get_data(as_text=True)
+    assert SECRET not in capsys.readouterr().out
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    os.environ.setdefault("GEMINI_API_KEY", "test")
+    monkeypatch.setenv("PROFILER", "1")
+    import app
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize("seconds", ["abc", "0", "-1", "nan"])
+def test_bad_duration_is_rejected_before_profiling(client, seconds):
+    import metrics
+    response = client.get(f"/debug/profile?seconds={seconds}")
+    assert response.status_code == 400
+    assert not metrics.profiler.running
+
+
+def test_profile_returns_collapsed_stacks(client):
+    import metrics
+    response = client.get("/debug/profile?seconds=0.05")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert not metrics.profiler.running
+
+
+def test_concurrent_profile_is_refused(client):
+    import metrics
+    assert metrics.profiler.start()
+    try:
+        response = client.get("/debug/profile?seconds=0.05")
+    finally:
+        metrics.profiler.stop()
+
+    assert response.status_code == 409
+    assert not metrics.profiler.running
@@ -0,0 +1,37 @@
+import pytest
+
+from response_cache import ResponseCache, words_match
+
+
+@pytest.fixture
+def cache():
+    cache = ResponseCache()
+    cache.put("Where should I travel in June?", "june reply", 1.0)
+    cache.put("Beach destinations for families", "beach reply", 1.0)
+    cache.put("Things to do in Marrakech", "marrakech reply", 1.0)
+    return cache
+
+
+@pytest.mark.parametrize("prompt, reply", [
+    ("where should i travel in june", "june reply"),
+    ("Beach destination for families", "beach reply"),
+    ("beach destinations for family", "beach reply"),
+    ("Things to do in Marakech?", "marrakech reply"),
+])
+def test_rewordings_hit(cache, prompt, reply):
+    assert cache.get(prompt) == reply
+
+
+@pytest.mark.parametrize("prompt", [
+    "Where should I travel in July?",
+    "Things to do in Madrid",
+    "Where should I travel in winter?",
+])
+def test_prompts_differing_by_a_word_miss(cache, prompt):
+    assert cache.get(prompt) is None
+
+
+def test_words_match_needs_a_counterpart_on_both_sides():
+    assert words_match("go in winter", "go in winter")
+    assert not words_match("go in winter", "go in the winter")
+    assert not words_match("in june", "in july")
@@ -0,0 +1,138 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import session_store
+from session_store import (MemorySessionStore, SQLiteSessionStore, SessionStore,
+                           history_size, trim_to_budget)
+
+
+def exchange(index, size=10):
+    return [
+        {"role": "user", "parts": [{"text": f"question {index} " + "x" * size}]},
+        {"role": "model", "parts": [{"text": f"answer {index} " + "y" * size}]},
+    ]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the store's view of time; other threads keep the real clock
+    monkeypatch.setattr(session_store, "time", SimpleNamespace(monotonic=clock, time=clock))
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemorySessionStore(**kwargs)
+        return SQLiteSessionStore(path=str(tmp_path / "sessions.db"), **kwargs)
+    return make
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_trim_to_budget_drops_whole_exchanges_oldest_first():
+    history = exchange(0) + exchange(1) + exchange(2)
+    budget = history_size(history[2:]) + 1
+
+    trimmed = trim_to_budget(history, budget)
+
+    assert trimmed == history[2:]
+    assert trim_to_budget(history, None) == history
+
+
+def test_get_returns_a_copy(make_store):
+    store = make_store()
+    store.save("a", exchange(0))
+
+    store.get("a").append({"role": "user", "parts": []})
+
+    assert store.get("a") == exchange(0)
+
+
+def test_least_recently_used_session_is_evicted(make_store, clock):
+    store = make_store(max_sessions=2)
+    store.save("a", exchange(0))
+    clock.now += 1
+    store.save("b", exchange(1))
+    clock.now += 1
+    store.get("a")
+    clock.now += 1
+    store.save("c", exchange(2))
+
+    assert store.get("a") == exchange(0)
+    assert store.get("b") == []
+    assert len(store) == 2
+    assert store.evictions == 1
+
+
+def test_idle_sessions_expire(make_store, clock):
+    store = make_store(ttl=60)
+    store.save("a", exchange(0))
+
+    clock.now += 30
+    assert store.get("a") == exchange(0)
+    # get() refreshed the idle timer
+    clock.now += 59
+    assert store.get("a") == exchange(0)
+    clock.now += 61
+    assert store.get("a") == []
+
+
+def test_saved_history_is_trimmed_to_the_byte_budget(make_store):
+    history = exchange(0, 500) + exchange(1, 500)
+    store = make_store(max_bytes=history_size(history[2:]) + 1)
+
+    store.save("a", history)
+
+    assert store.get("a") == history[2:]
+
+
+def test_counters(make_store):
+    store = make_store()
+    store.get("missing")
+    store.save("a", exchange(0))
+    store.get("a")
+    store.get("a")
+
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"], stats["sessions"]) == (2, 1, 1)
+
+
+def test_sqlite_history_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    SQLiteSessionStore(path=path).save("a", exchange(0))
+
+    assert SQLiteSessionStore(path=path).get("a") == exchange(0)
+
+
+def test_sqlite_counters_are_exact_under_concurrency(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "sessions.db"))
+    store.save("a", exchange(0))
+
+    def read():
+        for _ in range(50):
+            store.get("a")
+            store.get("missing")
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert (store.hits, store.misses) == (400, 400)
@@ -4,86 +4,51 @@ import madridImage from "../assets/Aymane.jpg";
 
 const Photo = () => {
   const [destinations, setDestinations] = useState([]);
-  const [visibleCount, setVisibleCount] = useState(10);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
 
-  const API_KEY = "b75e1cef2e2b27b7107f56b5a5f0cf0c";
+  const PAGE_SIZE = 10;
 
-  const fetchFlights = async () => {
+  // Le backend agrège et pagine déjà les destinations au départ du Maroc
+  const fetchDestinations = async (cursor = null) => {
     try {
-      setLoading(true);
-      const response = await fetch(
-          `http://api.aviationstack.com/v1/flights?access_key=${API_KEY}&dep_country=MA&limit=100`
-      );
-
-      if (!response.ok) {
-        throw new Error("Erreur lors de la récupération des données");
+      cursor ? setLoadingMore(true) : setLoading(true);
+      const params = new URLSearchParams({ origin: "MA", limit: PAGE_SIZE });
+      if (cursor) {
+        params.append("cursor", cursor);
       }
 
-      const { data, error: apiError } = await response.json();
+      const response = await fetch(`http://localhost:5000/api/destinations?${params.toString()}`);
 
-      if (apiError) {
-        throw new Error(apiError.info);
+      if (!response.ok) {
+        throw new Error("Erreur lors de la récupération des données");
       }
 
-      const processedDestinations = [];
-      const uniqueDestinations = new Set();
-
-      for (const flight of data) {
-        const { arrival, flight: flightInfo, departure } = flight;
-        const { airport: destinationCity, country: destinationCountry, country_code } = arrival;
-
-        if (
-            uniqueDestinations.has(destinationCity) ||
-            country_code === "MA" ||
-            !destinationCity
-        ) {
-          continue;
-        }
-
-        let price;
-        if (flightInfo.distance) {
-          price = Math.round(flightInfo.distance);
-        } else if (arrival.scheduled && departure.scheduled) {
-          const arrTime = new Date(arrival.scheduled);
-          const depTime = new Date(departure.scheduled);
-          const flightDuration = (arrTime - depTime) / (1000 * 60 * 60);
-          price = Math.round(flightDuration * 500);
-        } else {
-          const flightNumber = parseInt(flightInfo.number.replace(/\D/g, "")) || 1000;
-          price = flightNumber;
-        }
-
-        const displayName = destinationCity + (destinationCountry ? `, ${destinationCountry}` : "");
-
-        processedDestinations.push({
-          city: displayName,
-          price
-        });
-
-        uniqueDestinations.add(destinationCity);
-      }
+      const { data, next_cursor } = await response.json();
 
-      if (processedDestinations.length === 0) {
+      if (!cursor && data.length === 0) {
         throw new Error("Aucun vol trouvé au départ du Maroc");
       }
 
-      setDestinations(processedDestinations);
+      setDestinations((prev) => (cursor ? [...prev, ...data] : data));
+      setNextCursor(next_cursor);
     } catch (err) {
       console.error("Erreur API:", err);
       setError(err.message);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
   useEffect(() => {
-    fetchFlights();
+    fetchDestinations();
   }, []);
 
   const handleVoirPlus = () => {
-    setVisibleCount((prev) => prev + 10);
+    fetchDestinations(nextCursor);
   };
 
   return (
@@ -109,7 +74,7 @@ const Photo = () => {
               <div className={styles.error}>{error}</div>
           ) : (
               <>
-                {destinations.slice(0, visibleCount).map(({ city, price }, index) => (
+                {destinations.map(({ city, price }, index) => (
                     <div className={styles.destinationItem} key={index}>
                       <span className={styles.cityName}>{city}</span>
                       <div className={styles.priceContainer}>
@@ -122,13 +87,15 @@ const Photo = () => {
               </>
           )}
 
-          {!loading && visibleCount < destinations.length && (
+          {!loading && nextCursor && (
               <div className={styles.viewMore}>
-                <button onClick={handleVoirPlus}>Voir plus d'offres →</button>
+                <button onClick={handleVoirPlus} disabled={loadingMore}>
+                  {loadingMore ? "Chargement..." : "Voir plus d'offres →"}
+                </button>
               </div>
           )}
 
-          {!loading && visibleCount >= destinations.length && (
+          {!loading && !error && !nextCursor && (
               <div className={styles.noMore}>Toutes les offres sont affichées.</div>
           )}
         </div>
@@ -24,7 +24,7 @@ const Chatbot = ({ onClose }) => {
         setIsLoading(true);
 
         try {
-            const response = await fetch('http://localhost:5000/api/chat', {
+            const response = await fetch('http://localhost:5000/api/chat/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ 
@@ -33,13 +33,56 @@ const Chatbot = ({ onClose }) => {
                 }),
             });
 
-            const data = await response.json();
-            
-            if (data.error) {
-                throw new Error(data.error);
+            if (!response.ok || !response.body) {
+                const data = await response.json().catch(() => ({}));
+                throw new Error(data.error || `HTTP ${response.status}`);
             }
 
-            setMessages(prev => [...prev, { text: data.response, sender: 'bot' }]);
+            // Create the bot message on the first chunk and grow it as chunks arrive
+            const streamId = Date.now();
+            const appendToBot = (text) => {
+                setMessages(prev => {
+                    if (!prev.some(msg => msg.id === streamId)) {
+                        return [...prev, { id: streamId, text, sender: 'bot' }];
+                    }
+                    return prev.map(msg =>
+                        msg.id === streamId ? { ...msg, text: msg.text + text } : msg
+                    );
+                });
+            };
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+
+                buffer += decoder.decode(value, { stream: true });
+
+                // SSE events are separated by a blank line
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+
+                for (const rawEvent of events) {
+                    let eventName = 'message';
+                    let dataLine = '';
+                    for (const line of rawEvent.split('\n')) {
+                        if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                        else if (line.startsWith('data:')) dataLine += line.slice(5).trim();
+                    }
+                    if (!dataLine) continue;
+
+                    const data = JSON.parse(dataLine);
+                    if (eventName === 'error') {
+                        throw new Error(data.error);
+                    }
+                    if (eventName === 'message') {
+                        appendToBot(data.text);
+                    }
+                }
+            }
         } catch (error) {
             console.error('Chat error:', error);
             setMessages(prev => [...prev, { 
@@ -75,7 +118,7 @@ const Chatbot = ({ onClose }) => {
                         </div>
                     ))
                 )}
-                {isLoading && (
+                {isLoading && messages[messages.length - 1]?.sender !== 'bot' && (
                     <div className={styles.botMessage}>
                         <div className={styles.typingIndicator}>
                             <span>•</span><span>•</span><span>•</span>
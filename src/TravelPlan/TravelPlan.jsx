@@ -10,10 +10,11 @@ const FlightDestinations = () => {
   const [flightStatus, setFlightStatus] = useState("active");
   const [sortBy, setSortBy] = useState("departure");
   const [lastUpdated, setLastUpdated] = useState(null);
+  const [totalFlights, setTotalFlights] = useState(0);
+  const [snapshotVersion, setSnapshotVersion] = useState(null);
   const [apiAvailable, setApiAvailable] = useState(true);
 
 
-  const API_KEY = "b75e1cef2e2b27b7107f56b5a5f0cf0c";
   const FLIGHTS_PER_PAGE = 10;
 
   const fetchFlights = async () => {
@@ -23,21 +24,22 @@ const FlightDestinations = () => {
       setLoading(true);
       setError(null);
       const params = new URLSearchParams({
-        access_key: API_KEY,
         limit: FLIGHTS_PER_PAGE,
         offset: (page - 1) * FLIGHTS_PER_PAGE,
-        flight_status: flightStatus,
+        status: flightStatus,
+        sort: sortBy,
       });
 
-
-      if (searchTerm.match(/^[A-Za-z]{2}\d+$/)) {
-        params.append('flight_iata', searchTerm.toUpperCase());
-      } else if (searchTerm) {
-        params.append('airline_name', searchTerm);
+      if (searchTerm) {
+        params.append('q', searchTerm);
+      }
+      // Les pages suivantes viennent du même instantané que la première
+      if (page > 1 && snapshotVersion !== null) {
+        params.append('version', snapshotVersion);
       }
 
-      // Tentative avec un service de proxy CORS alternatif
-      const apiUrl = `https://api.allorigins.win/get?url=${encodeURIComponent(`https://api.aviationstack.com/v1/flights?${params.toString()}`)}`;
+      // Filtrage, tri et pagination sont faits côté serveur sur l'ensemble des vols
+      const apiUrl = `http://localhost:5000/api/flights/search?${params.toString()}`;
 
       const response = await fetch(apiUrl, {
         method: 'GET',
@@ -45,29 +47,27 @@ const FlightDestinations = () => {
         timeout: 10000
       });
 
+      if (response.status === 409) {
+        // Instantané remplacé entre-temps : on repart de la première page
+        setSnapshotVersion(null);
+        setLoading(false);
+        setPage(1);
+        return;
+      }
+
       if (!response.ok) {
         throw new Error(`Erreur API: ${response.status}`);
       }
 
-      const { contents } = await response.json();
-      const { data = [] } = JSON.parse(contents);
-
-
-      const currentTime = new Date();
-      const filteredFlights = data
-          .filter(({ departure }) => {
-            if (!departure?.scheduled) return false;
-            const departureTime = new Date(departure.scheduled);
-            return departureTime > currentTime;
-          })
-          .sort((a, b) => {
-            const dateA = new Date(sortBy === "departure" ? a.departure.scheduled : a.arrival.scheduled);
-            const dateB = new Date(sortBy === "departure" ? b.departure.scheduled : b.arrival.scheduled);
-            return dateA - dateB;
-          });
-
-      setFlights(filteredFlights);
-      setLastUpdated(new Date());
+      const { data = [], pagination, snapshot } = await response.json();
+
+      if (page === 1) {
+        setSnapshotVersion(snapshot?.version ?? null);
+      }
+
+      setFlights(data);
+      setTotalFlights(pagination?.total ?? data.length);
+      setLastUpdated(snapshot?.fetched_at ? new Date(snapshot.fetched_at * 1000) : new Date());
       setLoading(false);
 
     } catch (err) {
@@ -89,7 +89,7 @@ const FlightDestinations = () => {
     const controller = new AbortController();
     const timer = setTimeout(() => {
       fetchFlights();
-    }, 500);
+    }, 150);
 
     return () => {
       controller.abort();
@@ -147,7 +147,10 @@ const FlightDestinations = () => {
                 type="text"
                 placeholder="Rechercher un vol (ex: AF123) ou compagnie"
                 value={searchTerm}
-                onChange={(e) => setSearchTerm(e.target.value)}
+                onChange={(e) => {
+                  setSearchTerm(e.target.value);
+                  setPage(1);
+                }}
                 disabled={!apiAvailable}
             />
             <button
@@ -162,7 +165,10 @@ const FlightDestinations = () => {
           <div className={styles.filterGroup}>
             <select
                 value={flightStatus}
-                onChange={(e) => setFlightStatus(e.target.value)}
+                onChange={(e) => {
+                  setFlightStatus(e.target.value);
+                  setPage(1);
+                }}
                 disabled={loading}
             >
               <option value="active">En vol</option>
@@ -173,7 +179,10 @@ const FlightDestinations = () => {
 
             <select
                 value={sortBy}
-                onChange={(e) => setSortBy(e.target.value)}
+                onChange={(e) => {
+                  setSortBy(e.target.value);
+                  setPage(1);
+                }}
                 disabled={loading}
             >
               <option value="departure">Tri par départ ↑</option>
@@ -295,7 +304,7 @@ const FlightDestinations = () => {
 
               <button
                   onClick={() => setPage(p => p + 1)}
-                  disabled={loading || flights.length < FLIGHTS_PER_PAGE}
+                  disabled={loading || page * FLIGHTS_PER_PAGE >= totalFlights}
               >
                 Suivant
               </button>